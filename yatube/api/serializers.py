@@ -0,0 +1,80 @@
+import json
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Публичное имя поля -> поле для values(): модели не создаются.
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+# Ключ курсора выбирается всегда, даже если клиент его не просил.
+CURSOR_FIELDS = ('id', 'pub_date')
+STREAM_CHUNK = 100
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def requested_fields(value, available):
+    """Поля из параметра вида `id,text`; без параметра — все."""
+    if not value:
+        return list(available)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown or not names:
+        raise InvalidFields(
+            f'Неизвестные поля: {", ".join(unknown)}. '
+            f'Доступны: {", ".join(available)}.'
+        )
+    return list(dict.fromkeys(names))
+
+
+def values(queryset, fields, available, required=()):
+    lookups = [available[name] for name in fields] + list(required)
+    return queryset.values(*dict.fromkeys(lookups))
+
+
+def serialize(row, fields, available):
+    data = {name: row[available[name]] for name in fields}
+    if 'image' in data:
+        data['image'] = (
+            default_storage.url(data['image']) if data['image'] else None
+        )
+    return data
+
+
+def encode(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def stream(document, key, items):
+    """JSON-объект частями: поля `document` и массив `key` из `items`.
+
+    Массив собирается по мере чтения `items`, поэтому длинный список
+    не держится в памяти целиком.
+    """
+    head = encode(document)[:-1]
+    yield head + (', ' if document else '') + encode(key) + ': ['
+    separator = ''
+    batch = []
+    for item in items:
+        batch.append(encode(item))
+        if len(batch) == STREAM_CHUNK:
+            yield separator + ', '.join(batch)
+            separator, batch = ', ', []
+    if batch:
+        yield separator + ', '.join(batch)
+    yield ']}'
@@ -0,0 +1,116 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.posts = [
+            Post.objects.create(
+                author=self.author, text=f'Пост {number}', group=self.group
+            )
+            for number in range(3)
+        ]
+        self.post = self.posts[-1]
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def get_json(self, url, client=None, **params):
+        response = (client or self.client).get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_listings_mirror_html_feeds(self):
+        """Ленты API отдают те же посты, что и HTML-страницы."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        urls = {
+            reverse('api:v1:post_list'): self.client,
+            reverse(
+                'api:v1:group_posts', kwargs={'slug': self.group.slug}
+            ): self.client,
+            reverse(
+                'api:v1:profile', kwargs={'username': self.author.username}
+            ): self.client,
+            reverse('api:v1:follow'): self.reader_client,
+        }
+        expected = [post.pk for post in reversed(self.posts)]
+        for url, client in urls.items():
+            with self.subTest(url=url):
+                data = self.get_json(url, client)
+                self.assertEqual(
+                    [post['id'] for post in data['results']], expected
+                )
+                self.assertEqual(data['results'][0]['author'], 'author')
+
+    def test_listing_is_one_query(self):
+        """Страница ленты — один запрос без создания моделей."""
+        with self.assertNumQueries(1):
+            self.get_json(reverse('api:v1:post_list'))
+
+    def test_cursor_pagination(self):
+        """Курсор ведёт на следующую страницу."""
+        url = reverse('api:v1:post_list')
+        first = self.get_json(url, limit=2)
+        self.assertIsNone(first['previous'])
+        response = self.client.get(first['next'])
+        second = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(
+            [post['id'] for post in second['results']], [self.posts[0].pk]
+        )
+        self.assertIsNone(second['next'])
+
+    def test_sparse_fields(self):
+        """`?fields=` оставляет только запрошенные поля."""
+        data = self.get_json(reverse('api:v1:post_list'), fields='id,group')
+        self.assertEqual(
+            data['results'][0], {'id': self.post.pk, 'group': 'group'}
+        )
+        response = self.client.get(
+            reverse('api:v1:post_list'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_detail_with_comments(self):
+        """Пост отдаётся вместе с комментариями."""
+        url = reverse('api:v1:post_detail', kwargs={'post_id': self.post.pk})
+        data = self.get_json(url, comment_fields='author,text')
+        self.assertEqual(data['text'], self.post.text)
+        self.assertEqual(
+            data['comments'], [{'author': 'reader', 'text': 'Комментарий'}]
+        )
+        missing = reverse('api:v1:post_detail', kwargs={'post_id': 0})
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+    def test_etag_revalidation(self):
+        """Неизменная лента отвечает 304."""
+        url = reverse('api:v1:post_list')
+        response = self.client.get(url)
+        revalidated = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_follow_requires_login(self):
+        """Лента подписок без входа — 401."""
+        response = self.client.get(reverse('api:v1:follow'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_read_only(self):
+        """Запись через API запрещена."""
+        response = self.reader_client.post(reverse('api:v1:post_list'))
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,17 @@
+from django.urls import include, path
+
+from . import views
+
+app_name = 'api'
+
+v1_patterns = [
+    path('posts/', views.post_list, name='post_list'),
+    path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('group/<slug:slug>/', views.group_posts, name='group_posts'),
+    path('profile/<str:username>/', views.profile_posts, name='profile'),
+    path('follow/', views.follow_feed, name='follow'),
+]
+
+urlpatterns = [
+    path('v1/', include((v1_patterns, 'v1'))),
+]
@@ -0,0 +1,143 @@
+from functools import partial, wraps
+
+from django.contrib.auth import get_user_model
+from django.db import router
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+
+from core.replicas import use_replica
+from posts import feeds
+from posts.conditional import conditional, listing_state, post_state
+from posts.models import Comment, Group
+from posts.page_cache import GROUP_SCOPE, INDEX_SCOPE, PROFILE_SCOPE
+from posts.paginator import CursorPaginator
+from posts.timeline import TimelinePaginator
+from posts.views import COUNT_POSTS
+
+from .serializers import (
+    COMMENT_FIELDS, CURSOR_FIELDS, POST_FIELDS, InvalidFields,
+    requested_fields, serialize, stream, values,
+)
+
+MAX_LIMIT = 100
+User = get_user_model()
+
+
+def api_view(view):
+    """Ошибки запроса отдаются в JSON, а не HTML-страницей."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return JsonResponse({'detail': 'Не найдено.'}, status=404)
+        except InvalidFields as error:
+            return JsonResponse({'detail': str(error)}, status=400)
+    return wrapper
+
+
+def streaming_json(document, key, items):
+    return StreamingHttpResponse(
+        stream(document, key, items), content_type='application/json'
+    )
+
+
+def page_limit(request):
+    try:
+        limit = int(request.GET.get('limit', COUNT_POSTS))
+    except ValueError:
+        raise InvalidFields('limit должен быть числом.')
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def page_url(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+
+
+def page_response(request, queryset, paginator=CursorPaginator):
+    """Страница постов по курсору; `?fields=` выбирает поля."""
+    fields = requested_fields(request.GET.get('fields'), POST_FIELDS)
+    rows = values(queryset, fields, POST_FIELDS, CURSOR_FIELDS)
+    page = paginator(rows, page_limit(request)).get_cursor_page(
+        request.GET.get('cursor')
+    )
+    document = {
+        'next': page_url(request, page.next_cursor),
+        'previous': page_url(request, page.previous_cursor),
+    }
+    return streaming_json(document, 'results', (
+        serialize(row, fields, POST_FIELDS) for row in page.object_list
+    ))
+
+
+@use_replica
+@require_safe
+@conditional(listing_state(INDEX_SCOPE))
+@api_view
+def post_list(request):
+    return page_response(request, feeds.index_posts())
+
+
+@use_replica
+@require_safe
+@conditional(listing_state(GROUP_SCOPE))
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return page_response(request, feeds.group_posts(group))
+
+
+@use_replica
+@require_safe
+@conditional(listing_state(PROFILE_SCOPE))
+@api_view
+def profile_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return page_response(request, feeds.profile_posts(author))
+
+
+@use_replica
+@require_safe
+@api_view
+def follow_feed(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'detail': 'Нужно войти.'}, status=401)
+    return page_response(
+        request, feeds.follow_posts(request.user),
+        partial(TimelinePaginator, user=request.user),
+    )
+
+
+@use_replica
+@require_safe
+@conditional(post_state)
+@api_view
+def post_detail(request, post_id):
+    """Пост и его комментарии; `?comment_fields=` — поля комментариев."""
+    fields = requested_fields(request.GET.get('fields'), POST_FIELDS)
+    comment_fields = requested_fields(
+        request.GET.get('comment_fields'), COMMENT_FIELDS
+    )
+    post = values(
+        feeds.detail_posts().filter(pk=post_id), fields, POST_FIELDS
+    ).first()
+    if post is None:
+        raise Http404
+    # Комментарии читаются уже после выхода из представления, когда
+    # ReplicaMiddleware сбросил состояние запроса: база — сразу.
+    comments = values(
+        feeds.post_comments(post_id), comment_fields, COMMENT_FIELDS
+    ).using(router.db_for_read(Comment))
+    return streaming_json(
+        serialize(post, fields, POST_FIELDS),
+        'comments',
+        (
+            serialize(comment, comment_fields, COMMENT_FIELDS)
+            for comment in comments.iterator()
+        ),
+    )
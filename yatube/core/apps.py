@@ -1,5 +1,17 @@
 from django.apps import AppConfig
+from django.core.exceptions import ImproperlyConfigured
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .checks import check_debug_tooling
+
+        # Боевой профиль с отладкой не запускается вовсе, даже через WSGI,
+        # где системные проверки сами не выполняются.
+        errors = check_debug_tooling()
+        if errors:
+            raise ImproperlyConfigured(
+                '; '.join(error.msg for error in errors)
+            )
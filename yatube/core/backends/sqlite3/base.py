@@ -0,0 +1,37 @@
+from django.db.backends.sqlite3 import base
+
+# Значения по умолчанию; DATABASES[...]['PRAGMAS'] их дополняет.
+PRAGMAS = {
+    # Читатели не ждут писателя, писатель не ждёт читателей.
+    'journal_mode': 'WAL',
+    # В WAL так теряется разве что последняя транзакция при сбое питания,
+    # зато fsync не на каждый коммит.
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite для нескольких процессов сервера.
+
+    Соединение настраивается прагмами, а транзакции берут блокировку
+    записи сразу (BEGIN IMMEDIATE): писатели выстраиваются в очередь
+    через busy_timeout, а не падают с «database is locked», когда
+    читающая транзакция пытается стать пишущей.
+    """
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = {**PRAGMAS, **self.settings_dict.get('PRAGMAS', {})}
+        for name, value in pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        if self.settings_dict.get('BEGIN_IMMEDIATE', True):
+            self.cursor().execute('BEGIN IMMEDIATE')
+        else:
+            super()._start_transaction_under_autocommit()
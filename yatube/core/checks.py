@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.checks import Error, Warning, register
+
+# Отладочные приложения и middleware: в бою только замедляют ответы.
+DEBUG_ONLY_APPS = ('debug_toolbar',)
+DEBUG_ONLY_MIDDLEWARE = ('debug_toolbar.middleware.DebugToolbarMiddleware',)
+
+
+@register()
+def check_debug_tooling(app_configs=None, **kwargs):
+    """Профиль prod без DEBUG и без отладочных приложений и middleware."""
+    errors = []
+    if getattr(settings, 'PROFILE', None) != 'prod':
+        return errors
+    if settings.DEBUG:
+        errors.append(Error(
+            'DEBUG включён в профиле prod.',
+            hint='Уберите DEBUG из настроек профиля.',
+            id='core.E001',
+        ))
+    for app in DEBUG_ONLY_APPS:
+        if app in settings.INSTALLED_APPS:
+            errors.append(Error(
+                f'Отладочное приложение {app} в профиле prod.',
+                id='core.E002',
+            ))
+    for middleware in DEBUG_ONLY_MIDDLEWARE:
+        if middleware in settings.MIDDLEWARE:
+            errors.append(Error(
+                f'Отладочный middleware {middleware} в профиле prod.',
+                id='core.E003',
+            ))
+    return errors
+
+
+@register()
+def check_static_manifest(app_configs=None, **kwargs):
+    """С хранилищем статики по манифесту манифест уже собран."""
+    manifest = getattr(staticfiles_storage, 'manifest_name', None)
+    if manifest is None or staticfiles_storage.exists(manifest):
+        return []
+    return [Warning(
+        f'В {settings.STATIC_ROOT} нет {manifest}: страницы со статикой '
+        f'упадут.',
+        hint='Запустите python manage.py collectstatic --noinput.',
+        id='core.W001',
+    )]
@@ -0,0 +1,39 @@
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, connection
+
+LOCKED_MESSAGES = ('database is locked', 'database table is locked')
+RETRY_DELAY = 0.05
+
+
+def is_locked(error):
+    return any(message in str(error) for message in LOCKED_MESSAGES)
+
+
+def retry_on_locked(view):
+    """Повторяет представление, если база занята другим писателем.
+
+    SQLite пускает одного писателя; кто прождал busy_timeout, получает
+    «database is locked». Транзакция к этому моменту откатана, поэтому
+    представление запускается заново с растущей паузой со случайным
+    разбросом, всего WRITE_RETRY_ATTEMPTS раз. Внутри чужой транзакции
+    повторять нельзя: ошибка уходит выше.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        attempts = settings.WRITE_RETRY_ATTEMPTS
+        for attempt in range(1, attempts + 1):
+            try:
+                return view(*args, **kwargs)
+            except OperationalError as error:
+                if (
+                    attempt == attempts
+                    or not is_locked(error)
+                    or connection.in_atomic_block
+                ):
+                    raise
+            time.sleep(RETRY_DELAY * 2 ** attempt * random.uniform(0.5, 1))
+    return wrapper
@@ -0,0 +1,175 @@
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.handlers.wsgi import get_path_info
+from django.utils.http import http_date, parse_etags
+
+CHUNK = 64 * 1024
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Сжатые копии, которые кладёт collectstatic (core.staticfiles).
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+RANGE = re.compile(r'bytes=(\d*)-(\d*)')
+ZERO_QUALITY = re.compile(r'q=0(\.0*)?')
+# Имена из хэша содержимого у картинок постов (posts.storage).
+CONTENT_NAME = re.compile(r'(.+/)?[0-9a-f]{64}\.\w+')
+
+
+def accepted(header):
+    """Кодировки из Accept-Encoding, кроме запрещённых через q=0."""
+    codings = set()
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        if not ZERO_QUALITY.fullmatch(params.strip()):
+            codings.add(coding.strip().lower())
+    return codings
+
+
+def byte_range(header, size):
+    """Первый и последний байт из заголовка Range.
+
+    None — отдать файл целиком: диапазона нет, он не разобран или их
+    несколько. ValueError — диапазон за концом файла.
+    """
+    match = RANGE.fullmatch(header.replace(' ', ''))
+    if match is None or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        if not int(last):
+            raise ValueError(header)
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError(header)
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def chunks(file, length):
+    with file:
+        while length > 0:
+            data = file.read(min(CHUNK, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+class FileServer:
+    """WSGI-обёртка, которая отдаёт static и media, не заходя в Django.
+
+    Понимает If-None-Match и Range, текстовую статику отдаёт сжатой
+    копией, собранной collectstatic. Файлы с хэшем в имени не меняются
+    и кэшируются навсегда. Файл до конца передаётся через
+    wsgi.file_wrapper — сервер отправит его sendfile.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        hashed = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        self.roots = [
+            (settings.MEDIA_URL, settings.MEDIA_ROOT, False,
+             lambda name: CONTENT_NAME.fullmatch(name) is not None),
+        ]
+        if settings.STATIC_ROOT:
+            self.roots.append((
+                settings.STATIC_URL, settings.STATIC_ROOT, True,
+                hashed.__contains__,
+            ))
+
+    def __call__(self, environ, start_response):
+        if environ['REQUEST_METHOD'] in ('GET', 'HEAD'):
+            found = self.find(get_path_info(environ))
+            if found is not None:
+                try:
+                    return self.serve(environ, start_response, *found)
+                except OSError:
+                    # Нет файла или это каталог: решит Django.
+                    pass
+        return self.application(environ, start_response)
+
+    def find(self, path):
+        """(путь к файлу, отдавать ли сжатую копию, Cache-Control)."""
+        for prefix, root, precompressed, immutable in self.roots:
+            if not prefix.startswith('/') or not path.startswith(prefix):
+                continue
+            name = path[len(prefix):]
+            parts = name.split('/')
+            if {'', '.', '..'} & set(parts) or '\\' in name or '\0' in name:
+                return None
+            cache_control = (
+                IMMUTABLE if immutable(name)
+                else f'public, max-age={settings.FILES_MAX_AGE}'
+            )
+            return os.path.join(root, *parts), precompressed, cache_control
+        return None
+
+    def serve(self, environ, start_response, path, precompressed,
+              cache_control):
+        headers = [
+            ('Content-Type', mimetypes.guess_type(path)[0]
+             or 'application/octet-stream'),
+            ('Cache-Control', cache_control),
+            ('Accept-Ranges', 'bytes'),
+            ('X-Content-Type-Options', 'nosniff'),
+        ]
+        if precompressed:
+            headers.append(('Vary', 'Accept-Encoding'))
+            # Диапазоны отдаются из несжатого файла.
+            if 'HTTP_RANGE' not in environ:
+                path = self.encoded(environ, path, headers)
+        file = open(path, 'rb')
+        info = os.fstat(file.fileno())
+        if not stat.S_ISREG(info.st_mode):
+            file.close()
+            raise FileNotFoundError(path)
+        etag = f'"{info.st_mtime_ns:x}-{info.st_size:x}"'
+        headers += [
+            ('ETag', etag), ('Last-Modified', http_date(info.st_mtime)),
+        ]
+        try:
+            status, start, end = self.selection(environ, etag, info.st_size)
+        except ValueError:
+            status, start, end = '416 Range Not Satisfiable', 0, -1
+            headers.append(('Content-Range', f'bytes */{info.st_size}'))
+        if status == '206 Partial Content':
+            headers.append(
+                ('Content-Range', f'bytes {start}-{end}/{info.st_size}')
+            )
+        if status != '304 Not Modified':
+            headers.append(('Content-Length', str(end - start + 1)))
+        start_response(status, headers)
+        if status[0] != '2' or environ['REQUEST_METHOD'] == 'HEAD':
+            file.close()
+            return []
+        file.seek(start)
+        if end == info.st_size - 1 and 'wsgi.file_wrapper' in environ:
+            return environ['wsgi.file_wrapper'](file, CHUNK)
+        return chunks(file, end - start + 1)
+
+    def selection(self, environ, etag, size):
+        """Статус ответа и отдаваемые байты с первого по последний."""
+        etags = parse_etags(environ.get('HTTP_IF_NONE_MATCH', ''))
+        # Для If-None-Match слабый ETag равен сильному.
+        if '*' in etags or etag in {tag.replace('W/', '') for tag in etags}:
+            return '304 Not Modified', 0, -1
+        requested = environ.get('HTTP_RANGE')
+        if requested and environ.get('HTTP_IF_RANGE', etag) == etag:
+            selected = byte_range(requested, size)
+            if selected is not None:
+                return ('206 Partial Content', *selected)
+        return '200 OK', 0, size - 1
+
+    def encoded(self, environ, path, headers):
+        """Путь к сжатой копии, которую примет клиент, иначе к файлу."""
+        codings = accepted(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        for coding, extension in ENCODINGS:
+            if coding in codings and os.path.isfile(path + extension):
+                headers.append(('Content-Encoding', coding))
+                return path + extension
+        return path
@@ -0,0 +1,222 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.backends import django as django_backend
+
+TIME_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)
+
+METRIC_BUCKETS = {
+    'total_ms': TIME_BUCKETS,
+    'db_ms': TIME_BUCKETS,
+    'db_queries': COUNT_BUCKETS,
+    'template_ms': TIME_BUCKETS,
+    'cache_hits': COUNT_BUCKETS,
+    'cache_misses': COUNT_BUCKETS,
+    'response_bytes': SIZE_BUCKETS,
+}
+
+current_recorder = ContextVar('current_recorder', default=None)
+
+
+class Recorder:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_depth = 0
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.db_queries += 1
+
+    def metrics(self, response_bytes=None):
+        return {
+            'total_ms': (time.perf_counter() - self.started) * 1000,
+            'db_ms': self.db_seconds * 1000,
+            'db_queries': self.db_queries,
+            'template_ms': self.template_seconds * 1000,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'response_bytes': response_bytes,
+        }
+
+
+def server_timing(metrics):
+    """Значение заголовка Server-Timing."""
+    return ', '.join([
+        f'total;dur={metrics["total_ms"]:.1f}',
+        f'db;dur={metrics["db_ms"]:.1f};desc="{metrics["db_queries"]} q"',
+        f'tpl;dur={metrics["template_ms"]:.1f}',
+        'cache;desc="{} hit {} miss"'.format(
+            metrics['cache_hits'], metrics['cache_misses']
+        ),
+    ])
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.sum = 0
+
+    def add(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+
+    def percentile(self, fraction):
+        """Верхняя граница корзины, в которую попал перцентиль."""
+        threshold = self.total * fraction
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= threshold:
+                return (
+                    self.bounds[index] if index < len(self.bounds) else None
+                )
+        return None
+
+    def as_dict(self):
+        buckets = {f'le_{bound}': 0 for bound in self.bounds}
+        buckets['inf'] = 0
+        for key, count in zip(buckets, self.counts):
+            buckets[key] = count
+        return {
+            'count': self.total,
+            'avg': self.sum / self.total if self.total else 0,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'buckets': buckets,
+        }
+
+
+class Stats:
+    """Гистограммы замеров по именам представлений в пределах процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def record(self, view_name, metrics):
+        with self.lock:
+            histograms = self.views.setdefault(view_name, {
+                name: Histogram(bounds)
+                for name, bounds in METRIC_BUCKETS.items()
+            })
+            for name, value in metrics.items():
+                if value is not None:
+                    histograms[name].add(value)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                view_name: {
+                    name: histogram.as_dict()
+                    for name, histogram in histograms.items()
+                }
+                for view_name, histograms in self.views.items()
+            }
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+
+stats = Stats()
+
+_installed = False
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(self, *args, **kwargs):
+        recorder = current_recorder.get()
+        if recorder is None:
+            return render(self, *args, **kwargs)
+        recorder.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            recorder.template_depth -= 1
+            if not recorder.template_depth:
+                recorder.template_seconds += time.perf_counter() - started
+    return wrapper
+
+
+def _outer_cache_call(call, count):
+    """Считает только внешний вызов: get и get_many вызывают друг друга."""
+    recorder = current_recorder.get()
+    if recorder is None or recorder.cache_depth:
+        return call()
+    recorder.cache_depth += 1
+    try:
+        result = call()
+    finally:
+        recorder.cache_depth -= 1
+    hits, misses = count(result)
+    recorder.cache_hits += hits
+    recorder.cache_misses += misses
+    return result
+
+
+def _counted_get(get):
+    @wraps(get)
+    def wrapper(self, key, default=None, *args, **kwargs):
+        return _outer_cache_call(
+            lambda: get(self, key, default, *args, **kwargs),
+            lambda value: (0, 1) if value is default else (1, 0),
+        )
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(self, keys, *args, **kwargs):
+        keys = list(keys)
+        return _outer_cache_call(
+            lambda: get_many(self, keys, *args, **kwargs),
+            lambda values: (len(values), len(keys) - len(values)),
+        )
+    return wrapper
+
+
+def install():
+    """Подключает замеры шаблонов и кэша; повторный вызов ничего не делает.
+
+    Пока у потока нет активного Recorder, обёртки только вызывают
+    исходные методы.
+    """
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    template = django_backend.Template
+    template.render = _timed_render(template.render)
+    patched = set()
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        if backend in patched:
+            continue
+        patched.add(backend)
+        backend.get = _counted_get(backend.get)
+        backend.get_many = _counted_get_many(backend.get_many)
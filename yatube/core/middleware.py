@@ -0,0 +1,44 @@
+import random
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import instrumentation
+
+
+class PerformanceMiddleware:
+    """Замеряет время, запросы к базе, шаблоны и кэш по представлениям.
+
+    Замеряется доля запросов PERFORMANCE_SAMPLE_RATE; замеры уходят в
+    заголовок Server-Timing и в гистограммы `instrumentation.stats`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrumentation.install()
+
+    def __call__(self, request):
+        sample_rate = getattr(settings, 'PERFORMANCE_SAMPLE_RATE', 0)
+        if sample_rate <= 0 or random.random() >= sample_rate:
+            return self.get_response(request)
+
+        recorder = instrumentation.Recorder()
+        token = instrumentation.current_recorder.set(recorder)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(recorder.db_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            instrumentation.current_recorder.reset(token)
+
+        size = None if response.streaming else len(response.content)
+        metrics = recorder.metrics(size)
+        response['Server-Timing'] = instrumentation.server_timing(metrics)
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        instrumentation.stats.record(view_name, metrics)
+        return response
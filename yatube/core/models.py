@@ -0,0 +1,40 @@
+from django.db import models, router, transaction
+
+
+class AtomicSaveModel(models.Model):
+    """Сохраняет запись и обработчики post_save в одной транзакции."""
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, using=None, **kwargs):
+        using = using or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, using=using, **kwargs)
+
+
+class CountersModel(models.Model):
+    """Модель со счётчиками, которые меняются только через F().
+
+    save() существующей строки пишет все поля, кроме `counter_fields`:
+    иначе значения, прочитанные вместе с объектом, затрут приращения
+    параллельных запросов.
+    """
+
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if (
+            update_fields is None
+            and not self._state.adding
+            and not kwargs.get('force_insert')
+        ):
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, update_fields=update_fields, **kwargs)
@@ -0,0 +1,61 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from . import instrumentation
+
+# Обёртки execute_wrapper, которые ставятся соединениям потоков пула,
+# как соединениям вызывающего потока (например, в core.testing).
+query_wrappers = ContextVar('query_wrappers', default=())
+
+
+@lru_cache(maxsize=None)
+def executor(workers):
+    # Потоки живут долго, и с CONN_MAX_AGE их соединения переиспользуются.
+    return ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix='query'
+    )
+
+
+def run(call):
+    """Вызов в потоке пула: своё соединение и замеры текущего запроса."""
+    close_old_connections()
+    wrappers = list(query_wrappers.get())
+    recorder = instrumentation.current_recorder.get()
+    if recorder is not None:
+        wrappers.append(recorder.db_wrapper)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                for wrapper in wrappers:
+                    stack.enter_context(connection.execute_wrapper(wrapper))
+            return call()
+    finally:
+        close_old_connections()
+
+
+def gather(*calls):
+    """Результаты независимых вызовов с запросами к базе, по порядку.
+
+    Вызовы выполняются одновременно, каждый со своим соединением, и
+    страница ждёт самый долгий запрос, а не сумму всех. Внутри
+    транзакции соединение одно, поэтому там вызовы идут по очереди.
+    """
+    if (
+        len(calls) < 2
+        or not settings.QUERY_WORKERS
+        or any(connection.in_atomic_block for connection in connections.all())
+    ):
+        return [call() for call in calls]
+    pool = executor(settings.QUERY_WORKERS)
+    futures = [
+        pool.submit(contextvars.copy_context().run, run, call)
+        for call in calls[1:]
+    ]
+    first = calls[0]()
+    return [first] + [future.result() for future in futures]
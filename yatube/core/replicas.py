@@ -0,0 +1,135 @@
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+PIN_COOKIE = 'replica_pin'
+
+current_request = ContextVar('replica_request', default=None)
+
+
+class RequestState:
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+
+
+class ReplicaRouter:
+    """Чтение в представлениях с use_replica — с реплики, прочее — с default.
+
+    Реплики — копии default, которые наполняет репликация, а не migrate.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = current_request.get()
+        return state.replica if state is not None else None
+
+    def db_for_write(self, model, **hints):
+        state = current_request.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.REPLICA_DATABASES
+
+
+class ReplicaMiddleware:
+    """Следит, писал ли запрос в базу, и закрепляет автора за default.
+
+    После записи клиент получает куку на REPLICA_PIN_SECONDS: пока она
+    жива, его чтения идут в default и он сразу видит свои изменения,
+    даже если реплика отстаёт.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RequestState()
+        token = current_request.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        if state.wrote and settings.REPLICA_DATABASES:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+def use_replica(view):
+    """Запросы представления на чтение уходят на случайную реплику."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state = current_request.get()
+        if (
+            state is None
+            or not settings.REPLICA_DATABASES
+            or request.method not in ('GET', 'HEAD')
+            or PIN_COOKIE in request.COOKIES
+        ):
+            return view(request, *args, **kwargs)
+        # Состояние живёт, пока ReplicaMiddleware не вернул ответ.
+        # Потоковый ответ читает базу позже: его queryset нужно заранее
+        # привязать к реплике через .using(router.db_for_read(...)).
+        state.replica = random.choice(settings.REPLICA_DATABASES)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def fresh_reads(changed_at):
+    """Переводит чтение запроса с реплики на default после свежей записи.
+
+    Страницу, которая уйдёт в общий кэш, нельзя строить по отстающей
+    реплике: её отдадут всем, а не только писавшему. `changed_at` —
+    время последнего изменения данных страницы; в пределах
+    REPLICA_PIN_SECONDS реплика считается отстающей.
+    """
+    state = current_request.get()
+    if state is None or state.replica is None:
+        return
+    if time.time() - changed_at() < settings.REPLICA_PIN_SECONDS:
+        state.replica = None
+
+
+def lag():
+    """Отставание реплик по постам: сколько их нет и как давно.
+
+    Посты — основной поток записи; их первичный ключ растёт, поэтому
+    хватает сравнить последний id на реплике с default.
+    """
+    from posts.models import Post
+
+    posts = Post.objects.using('default')
+    report = {}
+    for alias in settings.REPLICA_DATABASES:
+        try:
+            last_pk = Post.objects.using(alias).order_by('-pk').values_list(
+                'pk', flat=True
+            ).first() or 0
+        except DatabaseError as error:
+            report[alias] = {'error': str(error)}
+            continue
+        missing = posts.filter(pk__gt=last_pk)
+        oldest = missing.order_by('pk').values_list(
+            'pub_date', flat=True
+        ).first()
+        report[alias] = {
+            'posts_behind': missing.count() if oldest else 0,
+            'lag_seconds': round(
+                (timezone.now() - oldest).total_seconds(), 3
+            ) if oldest else 0,
+        }
+    return report
@@ -0,0 +1,65 @@
+import gzip
+import logging
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Картинки и шрифты уже сжаты, повторное сжатие их только увеличит.
+COMPRESSIBLE = {
+    '.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml',
+    '.ico', '.eot', '.ttf', '.otf',
+}
+# Сжатая копия сохраняется, только если она заметно меньше.
+MIN_RATIO = 0.95
+
+
+def compressors():
+    """Расширение сжатой копии -> функция сжатия; без brotli только gzip."""
+    result = {'.gz': lambda data: gzip.compress(data, 9, mtime=0)}
+    if brotli is None:
+        logger.warning('Модуль brotli не установлен: копий .br не будет')
+    else:
+        # 11 — самое сильное сжатие: файл жмётся один раз при сборке.
+        result['.br'] = lambda data: brotli.compress(data, quality=11)
+    return result
+
+
+def compress(path, methods):
+    """Пишет рядом с файлом сжатые копии; вернёт их расширения."""
+    with open(path, 'rb') as file:
+        data = file.read()
+    written = []
+    for extension, method in methods.items():
+        compressed = method(data)
+        if len(compressed) < len(data) * MIN_RATIO:
+            with open(path + extension, 'wb') as file:
+                file.write(compressed)
+            written.append(extension)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хэши в именах файлов, как у Django, и сжатые копии при сборке.
+
+    collectstatic кладёт рядом с каждым текстовым файлом `.gz` и `.br`,
+    и core.fileserver отдаёт их без сжатия на каждый запрос.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        methods = compressors()
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE:
+                continue
+            if compress(self.path(name), methods):
+                yield name, name, True
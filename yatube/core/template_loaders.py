@@ -0,0 +1,100 @@
+import os
+import re
+
+from django.template import Origin, TemplateDoesNotExist, engines
+from django.template.loaders.base import Loader as BaseLoader
+from django.template.utils import get_app_template_dirs
+
+STATIC_INCLUDE = re.compile(
+    r'{%\s*include\s+(?P<quote>[\'"])(?P<name>[^\'"]+)(?P=quote)\s*%}'
+)
+# Такие шаблоны меняют смысл, если вставить их текст в другой шаблон.
+NOT_INLINABLE = re.compile(r'{%\s*(?:extends|block)\b')
+WARM_UP_SUFFIXES = ('.html', '.txt')
+
+
+class Loader(BaseLoader):
+    """Подставляет текст статических {% include %} прямо в шаблон.
+
+    Вложенные шаблоны с литеральным именем и без `with`/`only` компилируются
+    вместе с тем, кто их включает, поэтому рендер не ищет и не разбирает их
+    отдельно. Вставка оборачивается в {% with %}: как и у include, переменные
+    вложенного шаблона не попадают в окружающий контекст. Ставится под
+    cached.Loader.
+    """
+
+    def __init__(self, engine, loaders):
+        super().__init__(engine)
+        self.loaders = engine.get_template_loaders(loaders)
+
+    def get_template_sources(self, template_name):
+        for loader in self.loaders:
+            for source in loader.get_template_sources(template_name):
+                origin = Origin(
+                    name=source.name,
+                    template_name=source.template_name,
+                    loader=self,
+                )
+                origin.source = source
+                yield origin
+
+    def get_contents(self, origin):
+        source = origin.source
+        return self.flatten(
+            source.loader.get_contents(source), {origin.template_name}
+        )
+
+    def source(self, template_name):
+        for loader in self.loaders:
+            for origin in loader.get_template_sources(template_name):
+                try:
+                    return loader.get_contents(origin)
+                except TemplateDoesNotExist:
+                    continue
+        return None
+
+    def flatten(self, contents, seen):
+        def inline(match):
+            name = match.group('name')
+            if name in seen:
+                return match.group(0)
+            included = self.source(name)
+            if included is None or NOT_INLINABLE.search(included):
+                return match.group(0)
+            included = self.flatten(included, seen | {name})
+            return '{% with flattened_include=1 %}' + included + (
+                '{% endwith %}'
+            )
+        return STATIC_INCLUDE.sub(inline, contents)
+
+
+def template_names(engine):
+    """Имена всех шаблонов из каталогов движка и приложений."""
+    directories = list(engine.dirs)
+    if engine.app_dirs or any(
+        'app_directories' in str(loader) for loader in engine.loaders
+    ):
+        directories += get_app_template_dirs('templates')
+    names = set()
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            for file in files:
+                if file.endswith(WARM_UP_SUFFIXES):
+                    path = os.path.join(root, file)
+                    names.add(
+                        os.path.relpath(path, directory).replace(os.sep, '/')
+                    )
+    return sorted(names)
+
+
+def warm_up(engine=None):
+    """Компилирует все шаблоны заранее; возвращает их число.
+
+    С cached.Loader первый запрос уже не разбирает шаблоны, а ошибка
+    в любом шаблоне видна при запуске, а не на странице.
+    """
+    engine = engine or engines['django'].engine
+    names = template_names(engine)
+    for name in names:
+        engine.get_template(name)
+    return len(names)
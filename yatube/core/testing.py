@@ -0,0 +1,117 @@
+import statistics
+import subprocess
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+
+from . import parallel
+
+
+class QueryLog:
+    """Запросы ко всем базам из всех потоков, как у CaptureQueriesContext.
+
+    Ставится через execute_wrapper, поэтому видит и реплики, и потоки
+    core.parallel.gather.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.captured_queries = []
+
+    def __len__(self):
+        return len(self.captured_queries)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            connection = context['connection']
+            query = {
+                'sql': sql if many else connection.ops.last_executed_query(
+                    context['cursor'], sql, params
+                ),
+                'time': f'{time.perf_counter() - started:.3f}',
+                'alias': connection.alias,
+            }
+            with self.lock:
+                self.captured_queries.append(query)
+
+
+@contextmanager
+def capture_queries():
+    """QueryLog запросов блока: все базы и потоки core.parallel.gather."""
+    log = QueryLog()
+    token = parallel.query_wrappers.set(
+        (*parallel.query_wrappers.get(), log)
+    )
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(log))
+            yield log
+    finally:
+        parallel.query_wrappers.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit):
+    """Падает, если блок выполнил больше `limit` запросов к базе.
+
+    Считаются все базы из DATABASES и запросы потоков
+    core.parallel.gather. Пригоден и для unittest, и для pytest; в
+    сообщении об ошибке перечислены все выполненные запросы.
+    """
+    with capture_queries() as log:
+        yield log
+    executed = len(log)
+    if executed > limit:
+        queries = '\n'.join(
+            f'{number}. [{query["alias"]}] {query["sql"]}'
+            for number, query in enumerate(log.captured_queries, 1)
+        )
+        raise AssertionError(
+            f'Выполнено запросов: {executed}, допустимо: {limit}\n{queries}'
+        )
+
+
+def local_client(user=None):
+    """Тестовый клиент для замеров на рабочей базе.
+
+    Берёт первый разрешённый хост, а адрес клиента не входит
+    в INTERNAL_IPS, чтобы debug_toolbar не добавлял своих запросов.
+    """
+    host = next(
+        (host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'),
+        'localhost',
+    )
+    client = Client(HTTP_HOST=host, REMOTE_ADDR='192.0.2.1')
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+def percentiles(samples, ranks=(50, 95, 99)):
+    """Перцентили замеров: {'p50': ..., 'p95': ..., 'p99': ...}."""
+    if len(samples) < 2:
+        return {
+            f'p{rank}': samples[0] if samples else None for rank in ranks
+        }
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {f'p{rank}': round(cuts[rank - 1], 3) for rank in ranks}
+
+
+def git_commit():
+    """Короткий хэш текущего коммита или None вне git."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
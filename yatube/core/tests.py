@@ -1,4 +1,39 @@
-from django.test import Client, TestCase
+import asyncio
+import gzip
+import importlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.template import Context
+from django.template.backends.django import DjangoTemplates
+from django.template.loader_tags import IncludeNode
+from django.db import OperationalError, connection
+from django.test import (
+    Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.urls import reverse
+
+from core import instrumentation
+from core.checks import check_debug_tooling, check_static_manifest
+from core.db import retry_on_locked
+from core.fileserver import FileServer, byte_range
+from core.parallel import gather
+from core.replicas import (
+    PIN_COOKIE, ReplicaRouter, RequestState, current_request, fresh_reads,
+)
+from core.staticfiles import CompressedManifestStaticFilesStorage
+from core.template_loaders import warm_up
+from core.testing import assert_max_queries
+from posts.models import Comment, Post
+
+User = get_user_model()
 
 
 class CoreTests(TestCase):
@@ -9,3 +44,421 @@ class CoreTests(TestCase):
         """Страница 404 используют корректный шаблон"""
         response = self.guest_client.get('/unexisting_page/')
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+@override_settings(PERFORMANCE_SAMPLE_RATE=1)
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        instrumentation.stats.reset()
+        self.admin_client = Client()
+        self.admin_client.force_login(
+            User.objects.create_user(username='admin', is_staff=True)
+        )
+
+    def test_server_timing_header(self):
+        """Ответ содержит заголовок Server-Timing с замерами."""
+        response = self.client.get(reverse('about:author'))
+        header = response['Server-Timing']
+        for metric in ('total;dur=', 'db;dur=', 'tpl;dur=', 'cache;desc='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, header)
+
+    def test_stats_grouped_by_view_name(self):
+        """Замеры собираются в гистограммы по имени представления."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        stats = self.admin_client.get(reverse('core:stats')).json()
+        self.assertEqual(stats['posts:index']['total_ms']['count'], 2)
+        self.assertGreater(stats['posts:index']['db_queries']['count'], 0)
+        self.assertGreater(
+            stats['posts:index']['response_bytes']['avg'], 0
+        )
+
+    def test_stats_for_staff_only(self):
+        """Статистика закрыта от обычных пользователей."""
+        response = self.client.get(reverse('core:stats'))
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0)
+    def test_sampling_disabled(self):
+        """При нулевой доле замеров запросы не инструментируются."""
+        response = self.client.get(reverse('about:author'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(instrumentation.stats.snapshot(), {})
+
+
+class FlatteningLoaderTests(SimpleTestCase):
+    templates = {
+        'page.html': (
+            '{% include "card.html" %}|{{ name }}|'
+            '{% include "blocks.html" %}|{% include name_var %}'
+        ),
+        'card.html': '{% with name="card" %}{{ name }}{% endwith %}'
+                     '{% include "inner.html" %}',
+        'inner.html': '<{{ name }}>',
+        'blocks.html': '{% block extra %}block{% endblock %}',
+    }
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for name, source in self.templates.items():
+            with open(os.path.join(directory.name, name), 'w') as file:
+                file.write(source)
+        self.dirs = [directory.name]
+
+    def engine(self, flat):
+        loaders = ['django.template.loaders.filesystem.Loader']
+        if flat:
+            loaders = [('core.template_loaders.Loader', loaders)]
+        return DjangoTemplates({
+            'NAME': f'test-{flat}',
+            'DIRS': self.dirs,
+            'APP_DIRS': False,
+            'OPTIONS': {'loaders': loaders},
+        }).engine
+
+    def test_static_includes_are_inlined(self):
+        """Статические include вшиваются, вывод не меняется."""
+        context = {'name': 'page', 'name_var': 'inner.html'}
+        flat = self.engine(True).get_template('page.html')
+        plain = self.engine(False).get_template('page.html')
+        self.assertEqual(
+            flat.render(Context(context)), plain.render(Context(context))
+        )
+        includes = flat.nodelist.get_nodes_by_type(IncludeNode)
+        # Остаются include с блоками и с именем из переменной.
+        self.assertEqual(len(includes), 2)
+
+    def test_warm_up_compiles_all_templates(self):
+        """Прогрев компилирует каждый шаблон каталога."""
+        self.assertEqual(warm_up(self.engine(True)), len(self.templates))
+
+
+class ProfileCheckTests(SimpleTestCase):
+    def test_prod_profile_passes(self):
+        """Настройки prod проходят проверку отладочных инструментов."""
+        with mock.patch.dict(os.environ, SECRET_KEY='test'):
+            prod = importlib.import_module('yatube.settings.prod')
+        with override_settings(
+            PROFILE=prod.PROFILE,
+            DEBUG=prod.DEBUG,
+            INSTALLED_APPS=prod.INSTALLED_APPS,
+            MIDDLEWARE=prod.MIDDLEWARE,
+        ):
+            self.assertEqual(check_debug_tooling(), [])
+
+    def test_prod_with_debug_tooling_fails(self):
+        """prod с DEBUG и debug_toolbar не проходит проверку."""
+        from yatube.settings import dev
+
+        with override_settings(
+            PROFILE='prod',
+            DEBUG=True,
+            INSTALLED_APPS=dev.INSTALLED_APPS,
+            MIDDLEWARE=dev.MIDDLEWARE,
+        ):
+            ids = {error.id for error in check_debug_tooling()}
+        self.assertEqual(ids, {'core.E001', 'core.E002', 'core.E003'})
+
+
+class SqliteBackendTests(TestCase):
+    def test_pragmas(self):
+        """Соединение получает прагмы из core.backends.sqlite3."""
+        expected = {'synchronous': 1, 'temp_store': 2, 'busy_timeout': 5000}
+        with connection.cursor() as cursor:
+            for pragma, value in expected.items():
+                cursor.execute(f'PRAGMA {pragma}')
+                self.assertEqual(cursor.fetchone()[0], value, pragma)
+
+
+class RetryOnLockedTests(SimpleTestCase):
+    @override_settings(WRITE_RETRY_ATTEMPTS=3)
+    def test_retries_locked_writes(self):
+        """Занятая база — повтор, другие ошибки — сразу наружу."""
+        view = mock.Mock(side_effect=[
+            OperationalError('database is locked'), 'ok',
+        ])
+        with mock.patch('core.db.time.sleep') as sleep:
+            self.assertEqual(retry_on_locked(view)(), 'ok')
+        self.assertEqual(view.call_count, 2)
+        sleep.assert_called_once()
+        broken = mock.Mock(side_effect=OperationalError('no such table'))
+        with self.assertRaises(OperationalError):
+            retry_on_locked(broken)()
+        self.assertEqual(broken.call_count, 1)
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    def test_routes_reads_to_request_replica(self):
+        """Чтение — с реплики запроса, запись — в default с отметкой."""
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(User))
+        state = RequestState()
+        state.replica = 'replica_1'
+        token = current_request.set(state)
+        try:
+            self.assertEqual(router.db_for_read(User), 'replica_1')
+            self.assertEqual(router.db_for_write(User), 'default')
+        finally:
+            current_request.reset(token)
+        self.assertTrue(state.wrote)
+
+    def test_recent_change_reads_from_default(self):
+        """Недавно изменённые данные читаются из default, а не с реплики."""
+        state = RequestState()
+        token = current_request.set(state)
+        try:
+            for changed, replica in (
+                (time.time(), None),
+                (time.time() - 3600, 'replica_1'),
+            ):
+                with self.subTest(changed=changed):
+                    state.replica = 'replica_1'
+                    fresh_reads(lambda: changed)
+                    self.assertEqual(state.replica, replica)
+        finally:
+            current_request.reset(token)
+
+
+# Настоящей второй базы в тестах нет: роль реплики играет default.
+@override_settings(REPLICA_DATABASES=['default'])
+class ReplicaMiddlewareTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='writer', is_staff=True)
+        self.client.force_login(self.user)
+
+    def test_listing_uses_replica(self):
+        """Ленты читаются с реплики."""
+        with mock.patch(
+            'core.replicas.random.choice', return_value='default'
+        ) as choice:
+            self.client.get(reverse('posts:index'))
+        choice.assert_called_once()
+
+    def test_streamed_comments_use_replica(self):
+        """Комментарии потокового ответа API читаются с реплики."""
+        post = Post.objects.create(author=self.user, text='Пост')
+        Comment.objects.create(post=post, author=self.user, text='Ответ')
+        routed = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def recording(router, model, **hints):
+            alias = db_for_read(router, model, **hints)
+            if model is Comment:
+                routed.append(alias)
+            return alias
+
+        with mock.patch(
+            'core.replicas.random.choice', return_value='default'
+        ), mock.patch.object(ReplicaRouter, 'db_for_read', recording):
+            response = self.client.get(reverse(
+                'api:v1:post_detail', kwargs={'post_id': post.pk}
+            ))
+            document = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(document['comments']), 1)
+        self.assertEqual(routed, ['default'])
+
+    def test_write_pins_client_to_default(self):
+        """После записи клиент читает из default, пока жива кука."""
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'}
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+        with mock.patch('core.replicas.random.choice') as choice:
+            self.client.get(reverse('posts:index'))
+        choice.assert_not_called()
+
+    def test_stats_report_lag(self):
+        """Статистика показывает отставание каждой реплики."""
+        stats = self.client.get(reverse('core:stats')).json()
+        self.assertEqual(
+            stats['replicas'], {'default': {'posts_behind': 0,
+                                            'lag_seconds': 0}}
+        )
+
+
+class GatherTests(SimpleTestCase):
+    @override_settings(QUERY_WORKERS=3)
+    def test_runs_calls_in_separate_threads(self):
+        """Вызовы выполняются в разных потоках, результаты — по порядку."""
+        barrier = threading.Barrier(3, timeout=5)
+
+        def call(number):
+            barrier.wait()
+            return number, threading.get_ident()
+
+        results = gather(*(lambda n=n: call(n) for n in range(3)))
+        self.assertEqual([number for number, _ in results], [0, 1, 2])
+        self.assertEqual(len({ident for _, ident in results}), 3)
+
+    @override_settings(QUERY_WORKERS=0)
+    def test_sequential_without_workers(self):
+        """Без потоков вызовы идут по очереди в текущем потоке."""
+        results = gather(threading.get_ident, threading.get_ident)
+        self.assertEqual(results, [threading.get_ident()] * 2)
+
+    @override_settings(QUERY_WORKERS=3)
+    def test_errors_propagate(self):
+        """Исключение из потока поднимается у вызывающего."""
+        def broken():
+            raise ValueError('нет')
+
+        with self.assertRaises(ValueError):
+            gather(lambda: 1, broken)
+
+
+class AssertMaxQueriesTests(TransactionTestCase):
+    @override_settings(QUERY_WORKERS=2)
+    def test_counts_queries_of_gather_threads(self):
+        """Запросы из потоков gather тоже входят в счёт."""
+        with self.assertRaisesMessage(AssertionError, 'допустимо: 1'):
+            with assert_max_queries(1) as queries:
+                results = gather(User.objects.count, User.objects.count)
+        self.assertEqual(results, [0, 0])
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(
+            {query['alias'] for query in queries.captured_queries},
+            {'default'},
+        )
+
+
+class AsgiTests(SimpleTestCase):
+    def test_asgi_application_serves_pages(self):
+        """ASGI-приложение отдаёт страницы как WSGI."""
+        from yatube.asgi import application
+
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            'type': 'http', 'http_version': '1.1', 'method': 'GET',
+            'path': reverse('about:author'), 'query_string': b'',
+            'headers': [(b'host', b'localhost')],
+        }
+        asyncio.run(application(scope, receive, send))
+        self.assertEqual(messages[0]['status'], 200)
+
+
+class FileServerTests(SimpleTestCase):
+    CSS = b'body { color: red; }\n' * 200
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        # Как после копирования файлов в collectstatic.
+        static = os.path.join(root.name, 'static')
+        os.makedirs(os.path.join(static, 'css'))
+        with open(os.path.join(static, 'css', 'site.css'), 'wb') as file:
+            file.write(self.CSS)
+        media = os.path.join(root.name, 'media')
+        self.image = 'posts/ab/cd/' + 'ab' * 32 + '.jpg'
+        os.makedirs(os.path.join(media, os.path.dirname(self.image)))
+        with open(os.path.join(media, self.image), 'wb') as file:
+            file.write(bytes(range(256)))
+        overridden = override_settings(
+            STATIC_ROOT=static, MEDIA_ROOT=media,
+            STATICFILES_STORAGE=(
+                'core.staticfiles.CompressedManifestStaticFilesStorage'
+            ),
+        )
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        storage = CompressedManifestStaticFilesStorage()
+        list(storage.post_process(
+            {'css/site.css': (storage, 'css/site.css')}
+        ))
+        self.hashed = storage.stored_name('css/site.css')
+        self.django = mock.Mock(return_value=[b'django'])
+        self.server = FileServer(self.django)
+
+    def get(self, path, method='GET', **headers):
+        response = {}
+
+        def start_response(status, headers):
+            response['status'] = int(status.split()[0])
+            response['headers'] = dict(headers)
+
+        environ = {
+            'REQUEST_METHOD': method, 'PATH_INFO': path,
+            'wsgi.input': io.BytesIO(), **headers,
+        }
+        body = self.server(environ, start_response)
+        response['body'] = b''.join(body)
+        getattr(body, 'close', lambda: None)()
+        return response
+
+    def test_manifest_check(self):
+        """Проверка предупреждает, пока collectstatic не собрал манифест."""
+        self.assertEqual(check_static_manifest(), [])
+        os.remove(os.path.join(settings.STATIC_ROOT, 'staticfiles.json'))
+        self.assertEqual(
+            [warning.id for warning in check_static_manifest()],
+            ['core.W001'],
+        )
+
+    def test_hashed_static_is_precompressed_and_immutable(self):
+        """Статика с хэшем: сжатая копия и кэш навсегда."""
+        response = self.get(
+            f'/static/{self.hashed}', HTTP_ACCEPT_ENCODING='gzip, br;q=0'
+        )
+        self.assertEqual(response['status'], 200)
+        self.assertEqual(response['headers']['Content-Encoding'], 'gzip')
+        self.assertEqual(response['headers']['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['headers']['Cache-Control'])
+        self.assertEqual(gzip.decompress(response['body']), self.CSS)
+        plain = self.get('/static/css/site.css')
+        self.assertEqual(plain['body'], self.CSS)
+        self.assertNotIn('Content-Encoding', plain['headers'])
+        self.assertNotIn('immutable', plain['headers']['Cache-Control'])
+
+    def test_if_none_match(self):
+        """Совпавший ETag — 304 без тела."""
+        etag = self.get(f'/media/{self.image}')['headers']['ETag']
+        response = self.get(
+            f'/media/{self.image}', HTTP_IF_NONE_MATCH=f'W/{etag}'
+        )
+        self.assertEqual(response['status'], 304)
+        self.assertEqual(response['body'], b'')
+
+    def test_range(self):
+        """Range отдаёт часть файла, за концом файла — 416."""
+        response = self.get(f'/media/{self.image}', HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response['status'], 206)
+        self.assertEqual(response['body'], bytes([2, 3, 4, 5]))
+        self.assertEqual(
+            response['headers']['Content-Range'], 'bytes 2-5/256'
+        )
+        self.assertEqual(self.get(
+            f'/media/{self.image}', HTTP_RANGE='bytes=300-'
+        )['status'], 416)
+        self.assertEqual(byte_range('bytes=-16', 256), (240, 255))
+        self.assertIsNone(byte_range('bytes=0-1,4-5', 256))
+
+    def test_file_wrapper_for_whole_file(self):
+        """Файл до конца уходит в wsgi.file_wrapper, то есть в sendfile."""
+        wrapper = mock.Mock(return_value=[b'sent'])
+        response = self.get(
+            f'/media/{self.image}', HTTP_RANGE='bytes=250-',
+            **{'wsgi.file_wrapper': wrapper},
+        )
+        self.assertEqual(response['body'], b'sent')
+        self.assertEqual(wrapper.call_args[0][0].tell(), 250)
+        wrapper.call_args[0][0].close()
+
+    def test_other_requests_go_to_django(self):
+        """Чужие адреса, выход из каталога и POST обрабатывает Django."""
+        for path, method in (
+            ('/posts/', 'GET'),
+            ('/media/../secret', 'GET'),
+            ('/media/posts/missing.jpg', 'GET'),
+            ('/media/posts', 'GET'),
+            (f'/media/{self.image}', 'POST'),
+        ):
+            with self.subTest(path=path, method=method):
+                self.assertEqual(self.get(path, method)['body'], b'django')
@@ -1,5 +1,10 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from . import instrumentation, replicas
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +20,13 @@ def permission_denied(request, exception):
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+@staff_member_required
+def performance_stats(request):
+    if request.GET.get('reset'):
+        instrumentation.stats.reset()
+    snapshot = instrumentation.stats.snapshot()
+    if settings.REPLICA_DATABASES:
+        snapshot['replicas'] = replicas.lag()
+    return JsonResponse(snapshot)
@@ -1,5 +1,7 @@
 from django.contrib import admin
+from django.http import StreamingHttpResponse
 
+from . import export, search
 from .models import Group, Post
 
 
@@ -13,6 +15,37 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ('text', )
     list_filter = ('pub_date', )
     empty_value_display = '-пусто-'
+    actions = ('export_jsonl', 'export_csv')
+
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по обратному индексу вместо LIKE по всей таблице."""
+        if not search.terms(search_term):
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        found = search.search(search_term).values('pk')
+        return queryset.filter(pk__in=found), False
+
+    def export(self, queryset, fmt):
+        fields = export.SOURCES['posts'][1]
+        response = StreamingHttpResponse(
+            export.lines(export.rows(queryset, fields), fields, fmt),
+            content_type=(
+                'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+            ),
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{export.filename("posts", fmt)}"'
+        )
+        return response
+
+    def export_jsonl(self, request, queryset):
+        return self.export(queryset, 'jsonl')
+    export_jsonl.short_description = 'Выгрузить в JSONL'
+
+    def export_csv(self, request, queryset):
+        return self.export(queryset, 'csv')
+    export_csv.short_description = 'Выгрузить в CSV'
 
 
 admin.site.register(Post, PostAdmin)
@@ -0,0 +1,62 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from . import thumbnails
+
+TEMPLATE = 'includes/main.html'
+THUMBNAIL = '960x339'
+# Меняется вместе с разметкой карточки, чтобы не отдавать старые копии.
+TEMPLATE_VERSION = 2
+
+
+def version(post):
+    """Отпечаток всего, что показывает карточка поста.
+
+    Правка поста, смена имени автора или группы дают новый ключ,
+    поэтому явно сбрасывать кэш не нужно: старые копии доживают свой срок.
+    """
+    author = post.author
+    parts = (
+        TEMPLATE_VERSION,
+        post.text,
+        post.pub_date.isoformat(),
+        post.image.name or '',
+        author.username,
+        author.first_name,
+        author.last_name,
+        post.group_id or '',
+    )
+    return hashlib.md5(
+        '\0'.join(map(str, parts)).encode()
+    ).hexdigest()
+
+
+def card_key(post):
+    return f'post_card:{post.pk}:{version(post)}'
+
+
+def cached_cards(posts):
+    """Готовые карточки страницы одним обращением к кэшу: ключ -> HTML."""
+    return cache.get_many([card_key(post) for post in posts])
+
+
+def render_card(post, cards=None, manifests=None):
+    """HTML карточки: из кэша страницы, иначе рендер с сохранением.
+
+    `manifests` — миниатюры картинок страницы из thumbnails.manifests.
+    """
+    key = card_key(post)
+    if cards is not None and key in cards:
+        return cards[key]
+    if manifests is None:
+        manifests = thumbnails.manifests([post.image.name])
+    html = render_to_string(
+        TEMPLATE, {'post': post, 'manifests': manifests}
+    )
+    # Пока миниатюры строятся, в карточке заглушка: такую не сохраняем.
+    if not post.image or post.image.name in manifests:
+        cache.set(key, html, settings.POST_CARD_TIMEOUT)
+    return html
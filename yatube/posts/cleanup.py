@@ -0,0 +1,177 @@
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+from django.db import connections
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+
+from core import parallel
+
+from . import images
+from .models import Post, ThumbnailManifest
+
+
+def referenced():
+    """Имена файлов, на которые ссылается база, и манифесты-сироты.
+
+    Нужны картинки постов, их варианты и миниатюры из манифестов этих
+    картинок. Миниатюры не из манифеста страницы не показывают
+    (post_image читает только манифесты), так что они устарели.
+    """
+    posted = set(
+        Post.objects.exclude(image='').exclude(image__isnull=True).order_by(
+        ).values_list('image', flat=True).iterator()
+    )
+    names = set(posted)
+    for name in posted:
+        names.update(
+            images.variant_name(name, extension)
+            for extension in images.VARIANT_FORMATS
+        )
+    stale = []
+    for image, variants in ThumbnailManifest.objects.order_by().values_list(
+        'image', 'variants'
+    ).iterator():
+        if image in posted:
+            names.update(
+                variant[0] for variant in json.loads(variants).values()
+            )
+        else:
+            stale.append(image)
+    return names, stale
+
+
+def roots():
+    """Каталоги MEDIA_ROOT, которыми распоряжаются посты: свои и sorl."""
+    return [
+        Post._meta.get_field('image').upload_to,
+        thumbnail_settings.THUMBNAIL_PREFIX,
+    ]
+
+
+def walk(path):
+    """Файлы под `path` по одному, не собирая каталог в список."""
+    try:
+        entries = os.scandir(path)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+def orphans(names, min_age):
+    """Файлы без ссылок старше `min_age` секунд: (путь, имя, размер).
+
+    Свежие файлы не трогаются: загрузка или миниатюра могут быть уже
+    записаны, а пост или манифест — ещё нет.
+    """
+    location = images.storage().location
+    cutoff = time.time() - min_age
+    for root in roots():
+        for entry in walk(os.path.join(location, root)):
+            name = os.path.relpath(entry.path, location).replace(os.sep, '/')
+            if name in names:
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime <= cutoff:
+                yield entry.path, name, stat.st_size
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def remove(batch):
+    """Удаляет пачку сирот и их записи sorl; вернёт (файлов, байт).
+
+    Пока пачка ждала очереди, одинаковая загрузка могла снова сослаться
+    на файл, поэтому ссылки постов проверяются ещё раз.
+    """
+    posted = set(Post.objects.filter(
+        image__in=[name for _, name, _ in batch]
+    ).values_list('image', flat=True))
+    removed = []
+    size = 0
+    for path, name, length in batch:
+        if name in posted:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        removed.append(name)
+        size += length
+    if removed:
+        keys = []
+        for name in removed:
+            key = ImageFile(name, default.storage).key
+            keys += [add_prefix(key), add_prefix(key, 'thumbnails')]
+        default.kvstore._delete_raw(*keys)
+    return len(removed), size
+
+
+def throttled(batches, rate):
+    """Пачки не чаще `rate` файлов в секунду; 0 — без предела."""
+    started = time.monotonic()
+    passed = 0
+    for batch in batches:
+        yield batch
+        passed += len(batch)
+        if rate:
+            time.sleep(max(0, started + passed / rate - time.monotonic()))
+
+
+def pooled(batches, workers):
+    """Итоги remove для пачек, удаляемых в `workers` потоках.
+
+    В работе не больше двух пачек на поток, так что обход каталогов
+    не убегает вперёд.
+    """
+    pending = deque()
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix='cleanup'
+    ) as pool:
+        for batch in batches:
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+            pending.append(pool.submit(parallel.run, partial(remove, batch)))
+        for future in pending:
+            yield future.result()
+
+
+def collect(files, batch_size=500, workers=4, rate=0):
+    """Удаляет файлы пачками; вернёт (файлов, байт)."""
+    batches = throttled(batched(files, batch_size), rate)
+    # Как parallel.gather: в транзакции соединение одно.
+    if workers < 2 or any(
+        connection.in_atomic_block for connection in connections.all()
+    ):
+        results = map(remove, batches)
+    else:
+        results = pooled(batches, workers)
+    removed = size = 0
+    for count, length in results:
+        removed += count
+        size += length
+    return removed, size
+
+
+def delete_manifests(names, batch_size=500):
+    for batch in batched(names, batch_size):
+        ThumbnailManifest.objects.filter(image__in=batch).delete()
@@ -0,0 +1,97 @@
+import hashlib
+from functools import wraps
+
+from django.db.models import OuterRef, Subquery
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+
+from . import page_cache
+from .models import Comment, Post
+
+
+def conditional(state):
+    """Отвечает 304, если страница не менялась с прошлого визита.
+
+    `state(request, **kwargs)` до запуска представления возвращает
+    последнюю дату содержимого (или None) и области кэша страниц, от
+    которых оно зависит. ETag собирается из поколений этих областей,
+    а Last-Modified — из времени их последнего изменения, поэтому правки
+    и удаления тоже дают новый валидатор.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            latest, scopes = state(request, **kwargs)
+            etag, last_modified = _validators(request, latest, scopes)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            # Браузер переспрашивает сервер каждый раз, а не держит
+            # страницу по эвристике от Last-Modified.
+            patch_cache_control(
+                response,
+                no_cache=True,
+                private=request.user.is_authenticated,
+            )
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
+
+
+def _validators(request, latest, scopes):
+    if request.user.is_authenticated:
+        variant = f'user:{request.user.pk}'
+    else:
+        variant = 'anon'
+    versions = '.'.join(map(str, page_cache.generations(scopes)))
+    stamp = latest.timestamp() if latest is not None else 0
+    digest = hashlib.md5(
+        f'{versions}:{variant}:{stamp}'.encode()
+    ).hexdigest()
+    last_modified = int(max(page_cache.changed_at(scopes), stamp))
+    return quote_etag(digest), last_modified
+
+
+def listing_state(*scope_templates):
+    """Состояние ленты: только области кэша, без запросов к базе.
+
+    Любой новый пост сдвигает время изменения своих областей, так что
+    дата последней публикации в нём уже учтена.
+    """
+    def state(request, **kwargs):
+        return None, [
+            template.format(**kwargs) for template in scope_templates
+        ]
+    return state
+
+
+def post_state(request, post_id):
+    """Дата последнего комментария и области поста, автора и группы."""
+    last_comment = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by('-created').values('created')[:1]
+    row = Post.objects.filter(pk=post_id).annotate(
+        last_comment=Subquery(last_comment)
+    ).values_list(
+        'pub_date', 'last_comment', 'author__username', 'group__slug'
+    ).first()
+    scopes = [page_cache.POST_SCOPE.format(post_id=post_id)]
+    if row is None:
+        return None, scopes
+    pub_date, last_comment, username, slug = row
+    # Страница показывает имя автора, число его постов и название группы.
+    scopes.append(page_cache.PROFILE_SCOPE.format(username=username))
+    if slug is not None:
+        scopes.append(page_cache.GROUP_SCOPE.format(slug=slug))
+    return max(filter(None, (pub_date, last_comment))), scopes
@@ -0,0 +1,117 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+# Предел переменных в одном запросе SQLite — 999.
+ID_CHUNK = 900
+
+USER_COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def _add(queryset, field, delta):
+    # Разошедшийся счётчик не должен уходить в минус и ронять удаление.
+    return queryset.update(**{field: Greatest(F(field) + delta, Value(0))})
+
+
+def change_user_counter(user_id, field, delta):
+    """Сдвигает счётчик пользователя; нет строки — пересчитываем её."""
+    updated = _add(UserStats.objects.filter(user_id=user_id), field, delta)
+    if not updated and delta > 0:
+        recount_user(user_id)
+
+
+def change_group_counter(group_id, delta):
+    if group_id is not None:
+        _add(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def change_post_counter(post_id, delta):
+    _add(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def _count(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(total=Count('pk')).values('total')
+        ),
+        Value(0),
+    )
+
+
+def recount_user(user_id):
+    with transaction.atomic():
+        counters = User.objects.filter(pk=user_id).annotate(**{
+            field: _count(model, lookup)
+            for field, (model, lookup) in USER_COUNTERS.items()
+        }).values(*USER_COUNTERS).first()
+        if counters is None:
+            return
+        # save() строки счётчиков не пишет, поэтому update().
+        if not UserStats.objects.filter(user_id=user_id).update(**counters):
+            UserStats.objects.create(user_id=user_id, **counters)
+
+
+def scoped(queryset, ids, field='pk'):
+    """Весь queryset, если `ids` — None, иначе его части по id.
+
+    Части не длиннее ID_CHUNK: у SQLite предел переменных в запросе.
+    """
+    if ids is None:
+        return [queryset]
+    ids = sorted(set(ids) - {None})
+    return [
+        queryset.filter(**{f'{field}__in': ids[start:start + ID_CHUNK]})
+        for start in range(0, len(ids), ID_CHUNK)
+    ]
+
+
+def repair(groups=None, posts=None, users=None):
+    """Пересчитывает счётчики, возвращает число исправленных строк.
+
+    `groups`, `posts` и `users` — id строк для проверки; None — все.
+    """
+    repaired = 0
+    with transaction.atomic():
+        for queryset in scoped(
+            Group.objects.annotate(actual=_count(Post, 'group')), groups
+        ):
+            repaired += _repair(queryset, 'posts_count')
+        for queryset in scoped(
+            Post.objects.annotate(actual=_count(Comment, 'post')), posts
+        ):
+            repaired += _repair(queryset, 'comments_count')
+        for missing in scoped(User.objects.filter(stats__isnull=True), users):
+            UserStats.objects.bulk_create(
+                [UserStats(user=user) for user in missing.iterator()]
+            )
+        for field, (model, lookup) in USER_COUNTERS.items():
+            for queryset in scoped(
+                UserStats.objects.annotate(actual=_count(model, lookup)),
+                users, 'user_id',
+            ):
+                repaired += _repair(queryset, field, pk_field='user_id')
+    return repaired
+
+
+def _repair(queryset, field, pk_field='pk'):
+    drifted = queryset.exclude(actual=F(field)).values_list(
+        pk_field, 'actual'
+    )
+    repaired = 0
+    for pk, actual in drifted.iterator():
+        queryset.model.objects.filter(**{pk_field: pk}).update(
+            **{field: actual}
+        )
+        repaired += 1
+    return repaired
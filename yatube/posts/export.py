@@ -0,0 +1,86 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Follow, Group, Post
+
+BATCH_SIZE = 5000
+CHUNK_SIZE = 1000
+FORMATS = ('jsonl', 'csv')
+
+# Что выгружается: имя -> (модель, поля для values(), поле даты для --since).
+SOURCES = {
+    'posts': (Post, (
+        'id', 'pub_date', 'author_id', 'author__username', 'group_id',
+        'text', 'image', 'comments_count',
+    ), 'pub_date'),
+    'comments': (Comment, (
+        'id', 'created', 'post_id', 'author_id', 'author__username', 'text',
+    ), 'created'),
+    'follows': (Follow, (
+        'id', 'user_id', 'user__username', 'author_id', 'author__username',
+    ), None),
+    'groups': (Group, (
+        'id', 'slug', 'title', 'description', 'posts_count',
+    ), None),
+}
+
+
+def source_rows(name, since=None, since_id=None, batch_size=BATCH_SIZE):
+    """Строки выгрузки `name`, начиная с даты и/или id."""
+    model, fields, date_field = SOURCES[name]
+    queryset = model._default_manager.all()
+    if since is not None:
+        if date_field is None:
+            raise ValueError(f'У {name} нет даты для выгрузки с момента.')
+        queryset = queryset.filter(**{f'{date_field}__gte': since})
+    return rows(queryset, fields, since_id, batch_size)
+
+
+def rows(queryset, fields, since_id=None, batch_size=BATCH_SIZE):
+    """Словари из values() пачками по первичному ключу.
+
+    Каждая пачка — `pk > последний` по индексу ключа, без OFFSET и без
+    длинной транзакции на всю таблицу; память не растёт с её размером.
+    """
+    queryset = queryset.order_by('pk').values(*fields)
+    last = since_id
+    while True:
+        batch = queryset if last is None else queryset.filter(pk__gt=last)
+        count = 0
+        for row in batch[:batch_size].iterator(chunk_size=CHUNK_SIZE):
+            count += 1
+            last = row['id']
+            yield row
+        if count < batch_size:
+            return
+
+
+def jsonl_lines(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+class Echo:
+    """Файл, который возвращает записанное: csv.writer без буфера."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, fields):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([row[field] for field in fields])
+
+
+def lines(rows, fields, fmt):
+    if fmt == 'csv':
+        return csv_lines(rows, fields)
+    return jsonl_lines(rows)
+
+
+def filename(name, fmt, compress=False):
+    return f'{name}.{fmt}' + ('.gz' if compress else '')
@@ -0,0 +1,30 @@
+"""Запросы лент и страницы поста: общие для HTML-страниц и API."""
+from . import timeline
+from .models import Comment, Post
+
+
+def index_posts():
+    return Post.objects.for_listing()
+
+
+def group_posts(group):
+    """Посты группы; `group` — объект или подзапрос с её id."""
+    return Post.objects.filter(group=group).for_listing()
+
+
+def profile_posts(author):
+    """Посты автора; `author` — объект или подзапрос с его id."""
+    return Post.objects.filter(author=author).for_listing()
+
+
+def follow_posts(user):
+    return timeline.timeline_posts(user).for_listing()
+
+
+def detail_posts():
+    return Post.objects.select_related('author__stats', 'group')
+
+
+def post_comments(post):
+    """Комментарии поста (объект или id) по индексу (post, created)."""
+    return Comment.objects.filter(post=post).select_related('author')
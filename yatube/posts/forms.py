@@ -1,5 +1,6 @@
 from django import forms
 
+from . import images
 from .models import Comment, Post
 
 
@@ -10,6 +11,13 @@ class PostForm(forms.ModelForm):
         label = {'text': 'Введите текст', 'group': 'Выберите группу'}
         help_text = {'text': 'Любой текст', 'group': 'Из уже существующих'}
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # Новая загрузка; уже сохранённый файл не проверяется.
+        if getattr(image, 'image', None) is not None:
+            images.validate(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,178 @@
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.temp import NamedTemporaryFile
+from PIL import Image, ImageOps
+from sorl.thumbnail import delete as delete_thumbnails
+
+logger = logging.getLogger(__name__)
+
+# Расширение варианта -> формат Pillow.
+VARIANT_FORMATS = {'webp': 'WEBP', 'avif': 'AVIF'}
+EXIF_ORIENTATION = 0x0112
+
+
+def save_options(fmt):
+    quality = settings.POST_IMAGE_QUALITY
+    return {
+        'JPEG': {'quality': quality, 'optimize': True, 'progressive': True},
+        'PNG': {'optimize': True},
+        'WEBP': {'quality': quality, 'method': 4},
+        'AVIF': {'quality': quality},
+    }.get(fmt, {})
+
+
+def validate(upload):
+    """Проверяет загрузку до сохранения, не декодируя пикселей.
+
+    Размер файла известен из запроса, а формат и размеры картинки
+    forms.ImageField уже прочитал из заголовка в `upload.image`.
+    """
+    limit = settings.POST_IMAGE_MAX_BYTES
+    if upload.size > limit:
+        raise ValidationError(
+            f'Файл больше {limit // 2 ** 20} МБ.', code='file_too_large'
+        )
+    image = upload.image
+    if image.format not in settings.POST_IMAGE_FORMATS:
+        raise ValidationError(
+            f'Формат {image.format} не поддерживается.', code='format'
+        )
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            f'Слишком большая картинка: {width}x{height}.',
+            code='too_many_pixels',
+        )
+
+
+def variant_name(name, extension):
+    return f'{os.path.splitext(name)[0]}.{extension}'
+
+
+def needs_master(image):
+    """Нужно ли переписать оригинал: великоват или с метаданными."""
+    limit = settings.POST_IMAGE_MAX_SIDE
+    return (
+        max(image.size) > limit
+        or 'exif' in image.info
+        or image.getexif().get(EXIF_ORIENTATION, 1) != 1
+    )
+
+
+def master(image):
+    """Картинка, повёрнутая по EXIF и вписанная в POST_IMAGE_MAX_SIDE."""
+    limit = settings.POST_IMAGE_MAX_SIDE
+    # JPEG декодируется сразу уменьшенным в 2-8 раз, а не целиком.
+    image.draft(None, (limit, limit))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((limit, limit), Image.LANCZOS, reducing_gap=3.0)
+    return image
+
+
+def storage():
+    # Модуль импортируют процессы пула ещё до django.setup().
+    from .models import Post
+
+    return Post._meta.get_field('image').storage
+
+
+def store(image, name, fmt, save):
+    """Кодирует картинку и отдаёт файл в `save(name, file)`."""
+    options = save_options(fmt)
+    # Метаданные не переносятся, кроме цветового профиля.
+    if image.info.get('icc_profile'):
+        options['icc_profile'] = image.info['icc_profile']
+    with NamedTemporaryFile(suffix=os.path.splitext(name)[1]) as temp:
+        image.save(temp, fmt, **options)
+        temp.seek(0)
+        return save(name, File(temp))
+
+
+def variants(image, name):
+    """Копии в форматах POST_IMAGE_VARIANTS, которые умеет Pillow."""
+    Image.init()
+    for extension in settings.POST_IMAGE_VARIANTS:
+        fmt = VARIANT_FORMATS[extension]
+        if fmt not in Image.SAVE:
+            logger.warning('Pillow не умеет сохранять %s', fmt)
+            continue
+        converted = image
+        if image.mode not in ('RGB', 'RGBA'):
+            has_alpha = 'A' in image.mode or 'transparency' in image.info
+            converted = image.convert('RGBA' if has_alpha else 'RGB')
+        store(
+            converted, variant_name(name, extension), fmt,
+            storage().save_variant,
+        )
+
+
+def process(name):
+    """Готовит загруженную картинку поста и записывает её размеры.
+
+    Оригинал без метаданных и не больше POST_IMAGE_MAX_SIDE заменяет
+    загруженный у всех постов с ним; анимации остаются как есть.
+    Возвращает имя файла: у нового содержимого и имя новое.
+    """
+    from .models import Post
+
+    with storage().open(name) as file, Image.open(file) as image:
+        fmt = image.format
+        size = image.size
+        if not getattr(image, 'is_animated', False):
+            if needs_master(image):
+                image = master(image)
+                size = image.size
+                saved = store(image, name, fmt, storage().save)
+                if saved != name:
+                    Post.objects.filter(image=name).update(image=saved)
+                    release(name)
+                    name = saved
+            variants(image, name)
+    Post.objects.filter(image=name).update(
+        image_width=size[0], image_height=size[1]
+    )
+    return name
+
+
+def fresh(files, name):
+    """Моложе ли файл POST_IMAGE_MIN_AGE секунд.
+
+    Дату обновляет и повторная загрузка того же содержимого, так что
+    свежий файл может вот-вот понадобиться новому посту.
+    """
+    try:
+        modified = os.path.getmtime(files.path(name))
+    except FileNotFoundError:
+        return False
+    return time.time() - modified < settings.POST_IMAGE_MIN_AGE
+
+
+def release(name):
+    """Удаляет файл картинки, если на него не ссылается ни один пост.
+
+    Вместе с ним уходят варианты, миниатюры и их манифест. Файлы со
+    старыми именами не из хэша не трогаются: их переносит dedupe_media.
+    Свежий файл тоже остаётся — его уберёт clean_media, если ссылки так
+    и не появится. Возвращает, был ли файл удалён.
+    """
+    from .models import Post, ThumbnailManifest
+
+    files = storage()
+    if (
+        not name
+        or not files.is_content_name(name)
+        or Post.objects.filter(image=name).exists()
+        or fresh(files, name)
+    ):
+        return False
+    delete_thumbnails(name, delete_file=False)
+    ThumbnailManifest.objects.filter(image=name).delete()
+    for extension in VARIANT_FORMATS:
+        files.delete(variant_name(name, extension))
+    files.delete(name)
+    return True
@@ -0,0 +1,269 @@
+import csv
+import gzip
+import io
+import json
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+# Предел переменных в одном запросе SQLite — 999.
+LOOKUP_CHUNK = 900
+KINDS = ('groups', 'posts', 'comments', 'follows')
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Отключает auto_now_add, чтобы bulk_create сохранил заданные даты."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def read_rows(path):
+    """Строки файла JSONL или CSV (можно .gz) по одной, как словари."""
+    name = path[:-3] if path.endswith('.gz') else path
+    opener = gzip.open if path.endswith('.gz') else io.open
+    with opener(path, 'rt', encoding='utf-8', newline='') as file:
+        if name.endswith('.csv'):
+            yield from csv.DictReader(file)
+            return
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+class Lookup:
+    """Значение поля -> id, с кэшем в памяти на весь импорт.
+
+    Неизвестные значения пачки добираются одним запросом на каждые
+    LOOKUP_CHUNK штук; отсутствующие в базе тоже запоминаются.
+    """
+
+    def __init__(self, queryset, field):
+        self.queryset = queryset
+        self.field = field
+        self.ids = {}
+
+    def resolve(self, values):
+        missing = list({
+            value for value in values
+            if value is not None and value not in self.ids
+        })
+        for start in range(0, len(missing), LOOKUP_CHUNK):
+            chunk = missing[start:start + LOOKUP_CHUNK]
+            self.ids.update(dict.fromkeys(chunk))
+            self.ids.update(self.queryset.filter(
+                **{f'{self.field}__in': chunk}
+            ).values_list(self.field, 'pk'))
+
+    def __getitem__(self, value):
+        pk = self.ids.get(value)
+        if pk is None:
+            raise ValidationError(f'Не найдено: {self.field}={value!r}')
+        return pk
+
+
+def value(row, *names):
+    """Первое непустое поле строки из имён-синонимов."""
+    for name in names:
+        if row.get(name) not in (None, ''):
+            return row[name]
+    return None
+
+
+def number(text):
+    if text is None:
+        return None
+    try:
+        return int(text)
+    except (TypeError, ValueError):
+        raise ValidationError(f'Не число: {text!r}')
+
+
+def numbers(rows, *names):
+    """Числа из строк пачки для Lookup; кривые значения отсеются позже."""
+    for row in rows:
+        try:
+            yield number(value(row, *names))
+        except ValidationError:
+            continue
+
+
+def moment(text):
+    if text is None:
+        return timezone.now()
+    parsed = parse_datetime(text)
+    if parsed is None:
+        raise ValidationError(f'Не разобрать дату: {text!r}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class Importer:
+    """Загружает строки выгрузки пачками через bulk_create.
+
+    Сигналы моделей не срабатывают: счётчики, ленты и поисковый индекс
+    пересчитываются один раз после загрузки. Даты публикации
+    сохраняются исходные. Имена столбцов — как у posts.export.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        # Ошибки строк: (что грузили, номер строки, сообщения).
+        self.batch_size = batch_size
+        self.users = Lookup(User.objects, 'username')
+        self.user_ids = Lookup(User.objects, 'pk')
+        self.groups = Lookup(Group.objects, 'slug')
+        self.group_ids = Lookup(Group.objects, 'pk')
+        self.post_ids = Lookup(Post.objects, 'pk')
+        self.errors = []
+        # Что затронула загрузка: только это пересчитывается в конце.
+        self.authors = set()
+        self.followers = set()
+        self.followed = set()
+        self.group_set = set()
+        self.post_set = set()
+        self.commented = set()
+        # Посты без id в файле получат ключи больше этого.
+        self.last_post_id = Post.objects.aggregate(last=Max('pk'))['last']
+
+    def run(self, kind, rows):
+        """Загружает строки; после каждой пачки отдаёт число записанных."""
+        model, build, resolve = {
+            'groups': (Group, self.build_group, self.resolve_nothing),
+            'posts': (Post, self.build_post, self.resolve_post),
+            'comments': (Comment, self.build_comment, self.resolve_comment),
+            'follows': (Follow, self.build_follow, self.resolve_follow),
+        }[kind]
+        rows = enumerate(rows, start=1)
+        fields = model._meta.concrete_fields
+        dates = [
+            field for field in fields
+            if getattr(field, 'auto_now_add', False)
+        ]
+        # Связи проверены через Lookup, без запроса на каждую строку.
+        exclude = [
+            field.name for field in fields
+            if field.is_relation or field.primary_key
+        ]
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return
+            resolve([row for _, row in batch])
+            objects = []
+            for line, row in batch:
+                try:
+                    instance = build(row)
+                    instance.clean_fields(exclude=exclude)
+                except ValidationError as error:
+                    self.errors.append((kind, line, error.messages))
+                    continue
+                objects.append(instance)
+            with explicit_dates(*dates), transaction.atomic():
+                model.objects.bulk_create(
+                    objects, ignore_conflicts=model is Follow
+                )
+            yield len(objects)
+
+    def loaded_posts(self):
+        """id загруженных постов: заданные в файле и получившие новые."""
+        new = Post.objects.all()
+        if self.last_post_id is not None:
+            new = new.filter(pk__gt=self.last_post_id)
+        return (self.post_set - {None}) | set(
+            new.values_list('pk', flat=True).iterator()
+        )
+
+    def resolve_nothing(self, rows):
+        pass
+
+    def resolve_post(self, rows):
+        self.users.resolve(value(row, 'author__username', 'author')
+                           for row in rows)
+        self.groups.resolve(value(row, 'group__slug', 'group')
+                            for row in rows)
+        self.group_ids.resolve(numbers(rows, 'group_id'))
+
+    def resolve_comment(self, rows):
+        self.users.resolve(value(row, 'author__username', 'author')
+                           for row in rows)
+        self.post_ids.resolve(numbers(rows, 'post_id', 'post'))
+
+    def resolve_follow(self, rows):
+        self.users.resolve(value(row, 'user__username', 'user')
+                           for row in rows)
+        self.users.resolve(value(row, 'author__username', 'author')
+                           for row in rows)
+        self.user_ids.resolve(numbers(rows, 'user_id'))
+        self.user_ids.resolve(numbers(rows, 'author_id'))
+
+    def user(self, row, field):
+        """id пользователя по имени, а без имени — по столбцу `<field>_id`."""
+        username = value(row, f'{field}__username', field)
+        if username is None and value(row, f'{field}_id') is not None:
+            return self.user_ids[number(value(row, f'{field}_id'))]
+        return self.users[username]
+
+    def build_group(self, row):
+        return Group(
+            id=number(value(row, 'id')),
+            title=value(row, 'title'),
+            slug=value(row, 'slug'),
+            description=value(row, 'description') or '',
+        )
+
+    def build_post(self, row):
+        author_id = self.users[value(row, 'author__username', 'author')]
+        group_id = None
+        if value(row, 'group__slug', 'group') is not None:
+            group_id = self.groups[value(row, 'group__slug', 'group')]
+        elif value(row, 'group_id') is not None:
+            group_id = self.group_ids[number(value(row, 'group_id'))]
+        self.authors.add(author_id)
+        self.group_set.add(group_id)
+        pk = number(value(row, 'id'))
+        self.post_set.add(pk)
+        return Post(
+            id=pk,
+            author_id=author_id,
+            group_id=group_id,
+            text=value(row, 'text'),
+            image=value(row, 'image') or '',
+            pub_date=moment(value(row, 'pub_date')),
+        )
+
+    def build_comment(self, row):
+        post_id = self.post_ids[number(value(row, 'post_id', 'post'))]
+        self.commented.add(post_id)
+        return Comment(
+            id=number(value(row, 'id')),
+            post_id=post_id,
+            author_id=self.users[value(row, 'author__username', 'author')],
+            text=value(row, 'text'),
+            created=moment(value(row, 'created')),
+        )
+
+    def build_follow(self, row):
+        user_id = self.user(row, 'user')
+        author_id = self.user(row, 'author')
+        if user_id == author_id:
+            raise ValidationError('Подписка на самого себя.')
+        self.followers.add(user_id)
+        self.followed.add(author_id)
+        return Follow(user_id=user_id, author_id=author_id)
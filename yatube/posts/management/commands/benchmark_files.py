@@ -0,0 +1,165 @@
+import json
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.test import override_settings
+from django.urls import re_path
+from django.views.static import serve
+
+from core.fileserver import FileServer
+from core.testing import git_commit, percentiles
+
+from .benchmark_servers import wsgi_environ
+
+SERVERS = ('django', 'fileserver')
+STYLESHEET = 'css/bootstrap.min.css'
+ACCEPT_ENCODING = 'gzip, deflate, br'
+
+
+def serve_static(request, path):
+    return serve(request, path, document_root=settings.STATIC_ROOT)
+
+
+def serve_media(request, path):
+    return serve(request, path, document_root=settings.MEDIA_ROOT)
+
+
+# Как раньше: файлы отдаёт представление Django после всех middleware.
+urlpatterns = [
+    re_path(r'^static/(?P<path>.*)$', serve_static),
+    re_path(r'^media/(?P<path>.*)$', serve_media),
+]
+
+
+def request(application, url, headers):
+    """Статус, заголовки и длина тела ответа WSGI-приложения."""
+    response = {}
+
+    def start_response(status, response_headers, exc_info=None):
+        response['status'] = int(status.split()[0])
+        response['headers'] = dict(response_headers)
+
+    body = application({**wsgi_environ(url, ''), **headers}, start_response)
+    try:
+        response['bytes'] = sum(len(chunk) for chunk in body)
+    finally:
+        getattr(body, 'close', lambda: None)()
+    return response
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает отдачу статики и картинок представлением Django и '
+        'core.fileserver: сжатие, 304, диапазоны и заголовки кэша'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help='Запросов на каждый сценарий',
+        )
+        parser.add_argument(
+            '--image-size', type=int, default=512,
+            help='Размер картинки в КБ',
+        )
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as root, override_settings(
+            STATIC_ROOT=os.path.join(root, 'static'),
+            MEDIA_ROOT=os.path.join(root, 'media'),
+            STATICFILES_STORAGE=(
+                'core.staticfiles.CompressedManifestStaticFilesStorage'
+            ),
+            ROOT_URLCONF=__name__,
+        ):
+            started = time.perf_counter()
+            call_command('collectstatic', interactive=False, verbosity=0)
+            self.stdout.write(
+                f'collectstatic: {time.perf_counter() - started:.1f}s'
+            )
+            image = self.image(options['image_size'])
+            django = get_wsgi_application()
+            applications = {
+                'django': django, 'fileserver': FileServer(django),
+            }
+            results = {
+                server: self.run(application, image, options['requests'])
+                for server, application in applications.items()
+            }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(
+                    {'commit': git_commit(), 'results': results},
+                    file, ensure_ascii=False, indent=2,
+                )
+
+    def image(self, size):
+        """Картинка поста со случайным содержимым и именем из хэша."""
+        name = 'posts/ab/cd/' + 'ab' * 32 + '.jpg'
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as file:
+            file.write(os.urandom(size * 1024))
+        return name
+
+    def scenarios(self, application, image):
+        stylesheet = settings.STATIC_URL + staticfiles_storage.stored_name(
+            STYLESHEET
+        )
+        picture = settings.MEDIA_URL + image
+        compressed = {'HTTP_ACCEPT_ENCODING': ACCEPT_ENCODING}
+        # ETag у каждого сервера свой, его отдаёт первый ответ.
+        etag = request(application, stylesheet, compressed)['headers'].get(
+            'ETag', ''
+        )
+        return {
+            'css': (stylesheet, compressed),
+            'css-304': (
+                stylesheet, {**compressed, 'HTTP_IF_NONE_MATCH': etag},
+            ),
+            'image': (picture, {}),
+            'image-range': (picture, {'HTTP_RANGE': 'bytes=0-65535'}),
+        }
+
+    def run(self, application, image, total):
+        results = {}
+        for scenario, (url, headers) in self.scenarios(
+            application, image
+        ).items():
+            timings = []
+            started = time.perf_counter()
+            for _ in range(total):
+                began = time.perf_counter()
+                response = request(application, url, headers)
+                timings.append((time.perf_counter() - began) * 1000)
+            elapsed = time.perf_counter() - started
+            result = results[scenario] = {
+                'requests_per_second': round(total / elapsed, 1),
+                'latency_ms': percentiles(timings),
+                'status': response['status'],
+                'bytes': response['bytes'],
+                'encoding': response['headers'].get('Content-Encoding'),
+                'cache_control': response['headers'].get('Cache-Control'),
+            }
+            self.report(application, scenario, result)
+        return results
+
+    def report(self, application, scenario, result):
+        server = 'fileserver' if isinstance(application, FileServer) else (
+            'django'
+        )
+        latency = result['latency_ms']
+        self.stdout.write(
+            f'{server:<10} {scenario:<11} {result["status"]} '
+            f'{result["requests_per_second"]:>8.1f} запросов/с  '
+            f'p50={latency["p50"]:.2f}ms p99={latency["p99"]:.2f}ms  '
+            f'{result["bytes"]:>7} байт {result["encoding"] or "-":<5} '
+            f'{result["cache_control"] or "-"}'
+        )
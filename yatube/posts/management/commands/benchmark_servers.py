@@ -0,0 +1,258 @@
+import asyncio
+import io
+import json
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count, cycle, islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import override_settings
+from django.urls import reverse
+
+from core.testing import git_commit, local_client, percentiles
+from posts.models import Group, Post
+
+User = get_user_model()
+
+SERVERS = ('wsgi', 'asgi')
+HOST = 'localhost'
+
+
+def wsgi_environ(url, cookie):
+    path, _, query = url.partition('?')
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': HOST,
+        'HTTP_COOKIE': cookie,
+        'REMOTE_ADDR': '192.0.2.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+def wsgi_request(application, url, cookie):
+    statuses = []
+    body = application(
+        wsgi_environ(url, cookie),
+        lambda status, headers, exc_info=None: statuses.append(status),
+    )
+    try:
+        for _ in body:
+            pass
+    finally:
+        body.close()
+    return int(statuses[0].split()[0])
+
+
+async def asgi_request(application, url, cookie):
+    path, _, query = url.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', HOST.encode()), (b'cookie', cookie.encode())],
+        'client': ('192.0.2.1', 0),
+        'server': (HOST, 80),
+    }
+    statuses = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    await application(scope, receive, send)
+    return statuses[0]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность WSGI- и ASGI-приложения при '
+        'N одновременных запросах к ленте, профилю, группе и посту'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, nargs='+', default=[1, 8, 32],
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Запросов на каждый уровень одновременности',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=3,
+            help='Запросов к каждому адресу до замера',
+        )
+        parser.add_argument(
+            '--servers', nargs='+', choices=SERVERS, default=list(SERVERS),
+        )
+        parser.add_argument(
+            '--query-workers', type=int, nargs='+', default=[0, 4],
+            help='Потоков для запросов страницы, 0 — по очереди',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Уникальный параметр в каждом адресе: мимо кэша страниц',
+        )
+        parser.add_argument(
+            '--anonymous', action='store_true',
+            help='Запросы без входа на сайт',
+        )
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        applications = self.applications(options['servers'])
+        urls = self.urls()
+        cookie = self.cookie(options['anonymous'])
+        # Адреса --cold уникальны и между запусками: кэш бывает общим.
+        self.run_id = uuid.uuid4().hex[:8]
+        self.numbers = count()
+        results = {}
+        for workers in options['query_workers']:
+            mode = f'workers={workers}'
+            results[mode] = {}
+            with override_settings(QUERY_WORKERS=workers):
+                for server, application in applications.items():
+                    results[mode][server] = {}
+                    self.run(server, application, urls, cookie, 1, {
+                        **options,
+                        'requests': len(urls) * options['warmup'],
+                    })
+                    for concurrency in options['concurrency']:
+                        result = self.run(
+                            server, application, urls, cookie,
+                            concurrency, options,
+                        )
+                        results[mode][server][concurrency] = result
+                        self.report(mode, server, concurrency, result)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(
+                    {'commit': git_commit(), 'urls': urls,
+                     'results': results},
+                    file, ensure_ascii=False, indent=2,
+                )
+
+    def applications(self, servers):
+        applications = {}
+        if 'wsgi' in servers:
+            from yatube.wsgi import application
+            applications['wsgi'] = application
+        if 'asgi' in servers:
+            try:
+                from yatube.asgi import application
+            except ImportError as error:
+                raise CommandError(f'ASGI недоступен: {error}')
+            applications['asgi'] = application
+        return applications
+
+    def urls(self):
+        author = User.objects.order_by('-stats__posts_count').first()
+        post = Post.objects.order_by('-comments_count').first()
+        group = Group.objects.order_by('-posts_count').first()
+        if author is None or post is None:
+            raise CommandError(
+                'В базе нет данных: запустите generate_load_data.'
+            )
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', args=[author.username]),
+            reverse('posts:post_detail', args=[post.pk]),
+        ]
+        if group is not None:
+            urls.append(reverse('posts:group_posts', args=[group.slug]))
+        return urls
+
+    def cookie(self, anonymous):
+        if anonymous:
+            return ''
+        reader = User.objects.annotate(
+            follows=Count('follower')
+        ).order_by('-follows').first()
+        client = local_client(reader)
+        name = settings.SESSION_COOKIE_NAME
+        return f'{name}={client.cookies[name].value}'
+
+    def requests(self, urls, total, cold):
+        for url in islice(cycle(urls), total):
+            if cold:
+                url = f'{url}?bench={self.run_id}-{next(self.numbers)}'
+            yield url
+
+    def run(self, server, application, urls, cookie, concurrency, options):
+        requests = list(
+            self.requests(urls, options['requests'], options['cold'])
+        )
+        started = time.perf_counter()
+        if server == 'wsgi':
+            timings, statuses = self.run_wsgi(
+                application, requests, cookie, concurrency
+            )
+        else:
+            timings, statuses = asyncio.run(self.run_asgi(
+                application, requests, cookie, concurrency
+            ))
+        elapsed = time.perf_counter() - started
+        return {
+            'requests_per_second': round(len(timings) / elapsed, 1),
+            'latency_ms': percentiles(timings),
+            'status': sorted(set(statuses)),
+        }
+
+    def run_wsgi(self, application, requests, cookie, concurrency):
+        """Как многопоточный WSGI-сервер: поток на запрос из пула."""
+        def timed(url):
+            started = time.perf_counter()
+            status = wsgi_request(application, url, cookie)
+            return (time.perf_counter() - started) * 1000, status
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            runs = list(pool.map(timed, requests))
+        return [run[0] for run in runs], [run[1] for run in runs]
+
+    async def run_asgi(self, application, requests, cookie, concurrency):
+        """Как ASGI-сервер: `concurrency` соединений в одном цикле."""
+        queue = iter(requests)
+        timings = []
+        statuses = []
+
+        async def client():
+            for url in queue:
+                started = time.perf_counter()
+                statuses.append(await asgi_request(application, url, cookie))
+                timings.append((time.perf_counter() - started) * 1000)
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return timings, statuses
+
+    def report(self, mode, server, concurrency, result):
+        latency = result['latency_ms']
+        self.stdout.write(
+            f'{mode:<10} {server} одновременно={concurrency:<3} '
+            f'{result["requests_per_second"]:>7.1f} запросов/с  '
+            f'p50={latency["p50"]:.1f}ms p95={latency["p95"]:.1f}ms '
+            f'p99={latency["p99"]:.1f}ms статусы={result["status"]}'
+        )
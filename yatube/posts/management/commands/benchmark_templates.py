@@ -0,0 +1,92 @@
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+
+from core.testing import git_commit, percentiles
+from posts.models import Post
+from posts.views import COUNT_POSTS
+from posts.paginator import CursorPaginator
+
+TEMPLATE = 'posts/index.html'
+
+LOADERS = {
+    'uncached': settings.TEMPLATE_LOADERS,
+    'cached': [
+        ('django.template.loaders.cached.Loader', settings.TEMPLATE_LOADERS),
+    ],
+    'cached_flat': [
+        ('django.template.loaders.cached.Loader', [
+            ('core.template_loaders.Loader', settings.TEMPLATE_LOADERS),
+        ]),
+    ],
+}
+
+
+def backend(name, loaders):
+    config = settings.TEMPLATES[0]
+    return DjangoTemplates({
+        'NAME': f'benchmark-{name}',
+        'DIRS': config['DIRS'],
+        'APP_DIRS': False,
+        'OPTIONS': {**config['OPTIONS'], 'loaders': loaders},
+    })
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает холодный и прогретый рендер posts/index.html '
+        'с разными загрузчиками шаблонов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=200)
+        parser.add_argument('--cold-runs', type=int, default=20)
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.for_listing()
+        if not posts.exists():
+            raise CommandError(
+                'В базе нет постов: запустите generate_load_data.'
+            )
+        page = CursorPaginator(posts, COUNT_POSTS).get_cursor_page()
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        context = {'page_obj': page}
+        results = {}
+        for name, loaders in LOADERS.items():
+            cold = [
+                self.render(backend(name, loaders), context, request)
+                for _ in range(options['cold_runs'])
+            ]
+            engine = backend(name, loaders)
+            warm = [
+                self.render(engine, context, request)
+                for _ in range(options['renders'])
+            ]
+            results[name] = {
+                'cold_ms': percentiles(cold),
+                'warm_ms': percentiles(warm),
+            }
+            self.stdout.write(
+                f'{name:<12} cold p50={results[name]["cold_ms"]["p50"]:.2f}ms'
+                f'  warm p50={results[name]["warm_ms"]["p50"]:.2f}ms'
+                f' p95={results[name]["warm_ms"]["p95"]:.2f}ms'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(
+                    {'commit': git_commit(), 'template': TEMPLATE,
+                     'results': results},
+                    file, indent=2,
+                )
+
+    def render(self, engine, context, request):
+        started = time.perf_counter()
+        engine.get_template(TEMPLATE).render(context, request)
+        return (time.perf_counter() - started) * 1000
@@ -0,0 +1,178 @@
+import json
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.testing import git_commit, local_client, percentiles
+from posts import urls as posts_urls
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+# Только читающие маршруты: GET на подписку или отписку меняет базу,
+# а формы создания, правки и комментария замеряются не здесь.
+ROUTES = (
+    'index', 'group_posts', 'profile', 'post_detail', 'follow_index',
+    'search',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку (p50/p95/p99) и число запросов к базе для '
+        'читающих адресов из posts/urls.py и сохраняет результат в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом',
+        )
+        parser.add_argument(
+            '--anonymous', action='store_true',
+            help='Запросы без входа на сайт',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для результатов; по умолчанию bench-<коммит>.json',
+        )
+        parser.add_argument(
+            '--compare', help='JSON прошлого запуска для сравнения',
+        )
+
+    def handle(self, *args, **options):
+        reader = User.objects.annotate(
+            follows=Count('follower')
+        ).order_by('-follows').first()
+        if reader is None or not Post.objects.exists():
+            raise CommandError(
+                'В базе нет данных: запустите generate_load_data.'
+            )
+        client = local_client(None if options['anonymous'] else reader)
+        results = {}
+        for name, url in self.urls():
+            results[name] = self.measure(client, url, options)
+            self.report(name, results[name])
+        commit = git_commit()
+        run = {
+            'commit': commit,
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'options': {
+                key: options[key]
+                for key in ('requests', 'warmup', 'cold', 'anonymous')
+            },
+            'dataset': {
+                'users': User.objects.count(),
+                'groups': Group.objects.count(),
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+            'urls': results,
+        }
+        output = options['output'] or f'bench-{commit or "local"}.json'
+        with open(output, 'w', encoding='utf-8') as file:
+            json.dump(run, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Результаты: {output}'))
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def urls(self):
+        """Адреса маршрутов из ROUTES с самыми нагруженными объектами."""
+        author = User.objects.order_by('-stats__posts_count').first()
+        post = Post.objects.order_by('-comments_count').first()
+        group = Group.objects.order_by('-posts_count').first()
+        values = {
+            'username': author.username,
+            'post_id': post.pk,
+            'slug': group.slug if group else None,
+        }
+        # Представлениям с параметрами запроса нужны осмысленные значения.
+        params = {'search': {'q': post.text.split(maxsplit=1)[0]}}
+        patterns = {
+            pattern.name: pattern for pattern in posts_urls.urlpatterns
+        }
+        for route in ROUTES:
+            pattern = patterns[route]
+            kwargs = {
+                key: values[key] for key in pattern.pattern.converters
+            }
+            if None in kwargs.values():
+                continue
+            name = f'{posts_urls.app_name}:{pattern.name}'
+            url = reverse(name, kwargs=kwargs)
+            if pattern.name in params:
+                url = f'{url}?{urlencode(params[pattern.name])}'
+            yield name, url
+
+    def measure(self, client, url, options):
+        for _ in range(options['warmup']):
+            client.get(url)
+        timings = []
+        queries = []
+        statuses = set()
+        for _ in range(max(options['requests'], 1)):
+            if options['cold']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+            statuses.add(response.status_code)
+        return {
+            'url': url,
+            'status': sorted(statuses),
+            'latency_ms': {
+                **percentiles(timings),
+                'mean': round(statistics.fmean(timings), 3),
+            },
+            'queries': {
+                **percentiles(queries),
+                'max': max(queries, default=None),
+            },
+        }
+
+    def report(self, name, result):
+        latency = result['latency_ms']
+        self.stdout.write(
+            f'{name:<24} p50={latency["p50"]:.1f}ms '
+            f'p95={latency["p95"]:.1f}ms p99={latency["p99"]:.1f}ms '
+            f'queries={result["queries"]["p50"]:.0f}'
+        )
+
+    def compare(self, path, results):
+        with open(path, encoding='utf-8') as file:
+            previous = json.load(file)
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f'Сравнение с {previous.get("commit") or path}'
+            )
+        )
+        for name, result in results.items():
+            before = previous['urls'].get(name)
+            if before is None:
+                continue
+            old = before['latency_ms']['p95']
+            new = result['latency_ms']['p95']
+            change = (new - old) / old * 100 if old else 0
+            self.stdout.write(
+                f'{name:<24} p95 {old:.1f} -> {new:.1f}ms ({change:+.0f}%), '
+                f'queries {before["queries"]["p50"]:.0f} -> '
+                f'{result["queries"]["p50"]:.0f}'
+            )
@@ -0,0 +1,104 @@
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.testing import git_commit, percentiles
+from posts.models import Post
+from posts.write_benchmark import PREFIX, init_writer, write
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет пропускную способность записи при N одновременных '
+        'писателях в отдельных процессах'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--writers', type=int, nargs='+', default=[1, 2, 4, 8],
+        )
+        parser.add_argument(
+            '--writes', type=int, default=100, help='Записей на писателя',
+        )
+        parser.add_argument(
+            '--baseline', action='store_true',
+            help='Ещё прогон с настройками sqlite3 по умолчанию',
+        )
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+            raise CommandError('Нужна файловая база SQLite.')
+        author = self.prepare(max(options['writers']))
+        modes = ['tuned'] + ['baseline'] * options['baseline']
+        results = {}
+        try:
+            for mode in modes:
+                results[mode] = {}
+                for writers in options['writers']:
+                    result = self.run(mode, writers, author, options)
+                    results[mode][writers] = result
+                    self.report(mode, writers, result)
+        finally:
+            self.set_journal_mode('WAL')
+            User.objects.filter(username__startswith=PREFIX).delete()
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(
+                    {'commit': git_commit(), 'writes': options['writes'],
+                     'results': results},
+                    file, indent=2,
+                )
+
+    def prepare(self, writers):
+        author, _ = User.objects.get_or_create(username=f'{PREFIX}author')
+        for number in range(writers):
+            User.objects.get_or_create(username=f'{PREFIX}{number}')
+        self.post = Post.objects.create(author=author, text='Пост для замера')
+        return author.username
+
+    def set_journal_mode(self, mode):
+        # Режим журнала хранится в файле базы, а сменить его можно только
+        # без других соединений: это делается до запуска писателей.
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA journal_mode = {mode}')
+        connection.close()
+
+    def run(self, mode, writers, author, options):
+        self.set_journal_mode('DELETE' if mode == 'baseline' else 'WAL')
+        with ProcessPoolExecutor(
+            max_workers=writers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_writer,
+            initargs=(mode == 'baseline',),
+        ) as pool:
+            futures = [
+                pool.submit(
+                    write, f'{PREFIX}{number}', author, self.post.pk,
+                    options['writes'],
+                )
+                for number in range(writers)
+            ]
+            runs = [future.result() for future in futures]
+        timings = [timing for run in runs for timing in run[2]]
+        elapsed = max(run[1] for run in runs) - min(run[0] for run in runs)
+        return {
+            'writes_per_second': round(len(timings) / elapsed, 1),
+            'latency_ms': percentiles(timings),
+            'errors': sum(run[3] for run in runs),
+        }
+
+    def report(self, mode, writers, result):
+        latency = result['latency_ms']
+        self.stdout.write(
+            f'{mode:<8} писателей={writers:<3} '
+            f'{result["writes_per_second"]:>7.1f} записей/с  '
+            f'p50={latency["p50"]:.1f}ms p95={latency["p95"]:.1f}ms '
+            f'p99={latency["p99"]:.1f}ms ошибок={result["errors"]}'
+        )
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import cleanup
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет файлы в media, на которые не ссылается база: картинки '
+        'удалённых и изменённых постов, их варианты и устаревшие миниатюры'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать; с -v 2 ещё и перечислить файлы',
+        )
+        parser.add_argument(
+            '--min-age', type=int,
+            default=settings.POST_IMAGE_MIN_AGE // 60,
+            help='Не трогать файлы моложе стольких минут',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Потоков, удаляющих пачки',
+        )
+        parser.add_argument(
+            '--rate', type=float, default=0,
+            help='Не больше стольких удалений в секунду, 0 — без предела',
+        )
+
+    def handle(self, *args, **options):
+        names, stale = cleanup.referenced()
+        files = cleanup.orphans(names, options['min_age'] * 60)
+        if options['dry_run']:
+            count = size = 0
+            for path, name, length in files:
+                count += 1
+                size += length
+                if options['verbosity'] > 1:
+                    self.stdout.write(name)
+            self.stdout.write(self.style.SUCCESS(
+                f'Можно удалить файлов: {count} ({size // 1024} КБ), '
+                f'манифестов: {len(stale)}'
+            ))
+            return
+        count, size = cleanup.collect(
+            files, options['batch_size'], options['workers'],
+            options['rate'],
+        )
+        cleanup.delete_manifests(stale, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено файлов: {count} ({size // 1024} КБ), '
+            f'манифестов: {len(stale)}'
+        ))
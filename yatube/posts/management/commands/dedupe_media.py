@@ -0,0 +1,88 @@
+import os
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import delete as delete_thumbnails
+
+from posts import images, thumbnails
+from posts.models import Post, ThumbnailManifest
+from posts.storage import digest
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов в хранилище по содержимому: одинаковые '
+        'файлы становятся одним, остальные получают имя из хэша'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, ничего не меняя',
+        )
+        parser.add_argument(
+            '--skip-thumbnails', action='store_true',
+            help='Не обрабатывать перенесённые картинки и не строить '
+                 'миниатюры; это сделает generate_thumbnails',
+        )
+
+    def handle(self, *args, **options):
+        storage = images.storage()
+        names = [
+            name for name in Post.objects.exclude(image='').exclude(
+                image__isnull=True
+            ).order_by().values_list('image', flat=True).distinct().iterator()
+            if not storage.is_content_name(name)
+        ]
+        counts = dict.fromkeys(('moved', 'duplicates', 'missing'), 0)
+        freed = 0
+        targets = set()
+        for name in names:
+            path = storage.path(name)
+            if not os.path.exists(path):
+                counts['missing'] += 1
+                continue
+            with open(path, 'rb') as file:
+                target = storage.content_name(
+                    digest(File(file)), os.path.splitext(name)[1]
+                )
+            duplicate = target in targets or storage.exists(target)
+            counts['duplicates' if duplicate else 'moved'] += 1
+            if duplicate:
+                freed += os.path.getsize(path)
+            if options['dry_run']:
+                targets.add(target)
+                continue
+            self.move(storage, name, path, target, duplicate)
+            targets.add(target)
+        if not options['dry_run']:
+            for target in targets:
+                if options['skip_thumbnails']:
+                    thumbnails.refresh_pages(target)
+                else:
+                    thumbnails.refresh_pages(thumbnails.prepare(target))
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено: {counts["moved"]}, '
+            f'повторов: {counts["duplicates"]} ({freed // 1024} КБ), '
+            f'нет файла: {counts["missing"]}'
+        ))
+
+    def move(self, storage, name, path, target, duplicate):
+        """Ссылки постов — на файл по содержимому, старый файл — прочь.
+
+        Новое имя появляется жёсткой ссылкой до обновления постов, так
+        что картинка доступна на каждом шаге.
+        """
+        if not duplicate:
+            target_path = storage.path(target)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            try:
+                os.link(path, target_path)
+            except FileExistsError:
+                pass
+        Post.objects.filter(image=name).update(image=target)
+        os.remove(path)
+        delete_thumbnails(name, delete_file=False)
+        ThumbnailManifest.objects.filter(image=name).delete()
+        for extension in images.VARIANT_FORMATS:
+            storage.delete(images.variant_name(name, extension))
@@ -0,0 +1,83 @@
+import re
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count
+from django.urls import reverse
+
+from core.testing import capture_queries, local_client
+from posts.models import Group, Post
+
+User = get_user_model()
+
+NEXT_CURSOR = re.compile(r'href="\?cursor=([^"]+)">\s*Следующая')
+
+
+class Command(BaseCommand):
+    help = (
+        'Открывает страницы приложения posts и печатает планы '
+        'выполнения всех их запросов'
+    )
+
+    def handle(self, *args, **options):
+        author = User.objects.order_by('-stats__posts_count').first()
+        reader = User.objects.annotate(
+            follows=Count('follower')
+        ).order_by('-follows').first()
+        group = Group.objects.order_by('-posts_count').first()
+        post = Post.objects.order_by('-comments_count').first()
+        if author is None or post is None:
+            self.stderr.write('В базе нет данных для запросов.')
+            return
+
+        client = local_client(reader)
+        pages = [
+            ('posts:index', reverse('posts:index')),
+            ('posts:profile', reverse('posts:profile', args=[author])),
+            ('posts:post_detail', reverse(
+                'posts:post_detail', args=[post.pk]
+            )),
+            ('posts:follow_index', reverse('posts:follow_index')),
+        ]
+        if group is not None:
+            pages.append(
+                ('posts:group_posts', reverse('posts:group_posts', args=[
+                    group.slug
+                ]))
+            )
+        for view_name, url in pages:
+            response = self.explain_page(client, view_name, url)
+            cursor = NEXT_CURSOR.search(response.content.decode())
+            if cursor:
+                self.explain_page(
+                    client, view_name, url, {'cursor': cursor.group(1)}
+                )
+
+    def explain_page(self, client, view_name, url, params=None):
+        params = dict(params or {})
+        # Уникальный параметр не даёт ответу взяться из кэша страниц.
+        params['explain'] = uuid.uuid4().hex
+        # Запросы к репликам и из потоков gather тоже попадают в план.
+        with capture_queries() as queries:
+            response = client.get(url, params)
+        label = 'cursor' if 'cursor' in params else 'first page'
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(f'== {view_name} ({label})')
+        )
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            connection = connections[query['alias']]
+            prefix = connection.ops.explain_query_prefix()
+            self.stdout.write(
+                self.style.SQL_KEYWORD(f'[{query["alias"]}] {sql}')
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(f'{prefix} {sql}')
+                for row in cursor.fetchall():
+                    self.stdout.write('    ' + ' '.join(map(str, row)))
+            self.stdout.write('')
+        return response
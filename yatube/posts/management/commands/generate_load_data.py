@@ -0,0 +1,204 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+
+from posts import counters, search, timeline
+from posts.importer import explicit_dates
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+SENTENCES = 2000
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу правдоподобными данными для нагрузочных замеров: '
+        'пользователи, группы, посты, комментарии и граф подписок'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок пользователя',
+        )
+        parser.add_argument(
+            '--distribution', choices=('zipf', 'uniform'), default='zipf',
+            help=(
+                'Как распределены посты и подписчики между авторами: '
+                'zipf — немногие популярные авторы получают почти всё'
+            ),
+        )
+        parser.add_argument('--zipf-exponent', type=float, default=1.1)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument(
+            '--skip-search-index', action='store_true',
+            help='Не строить поисковый индекс',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.random = random.Random(options['seed'])
+        self.faker = Faker('ru_RU')
+        self.faker.seed_instance(options['seed'])
+        self.sentences = [self.faker.sentence() for _ in range(SENTENCES)]
+        self.now = timezone.now()
+
+        users = self.step('Пользователи', self.create_users)
+        groups = self.step('Группы', self.create_groups)
+        weights = self.author_weights(len(users))
+        posts = self.step(
+            'Посты', self.create_posts, users, groups, weights
+        )
+        self.step('Комментарии', self.create_comments, users, posts)
+        self.step('Подписки', self.create_follows, users, weights)
+        self.step('Счётчики', counters.repair)
+        self.step('Ленты', self.rebuild_timelines, users)
+        if not options['skip_search_index']:
+            self.step('Поисковый индекс', search.rebuild)
+        cache.clear()
+
+    def step(self, title, function, *args):
+        started = time.perf_counter()
+        with transaction.atomic():
+            result = function(*args)
+        self.stdout.write(
+            f'{title}: {time.perf_counter() - started:.1f} с'
+        )
+        return result
+
+    def author_weights(self, count):
+        """Накопленные веса авторов для random.choices."""
+        if self.options['distribution'] == 'uniform':
+            return None
+        exponent = self.options['zipf_exponent']
+        return list(accumulate(
+            1 / rank ** exponent for rank in range(1, count + 1)
+        ))
+
+    def text(self, sentences):
+        return ' '.join(self.random.choices(self.sentences, k=sentences))
+
+    def date(self):
+        seconds = self.random.uniform(0, self.options['days'] * 86400)
+        return self.now - timedelta(seconds=seconds)
+
+    def batches(self, total):
+        size = self.options['batch_size']
+        for start in range(0, total, size):
+            yield range(start, min(start + size, total))
+
+    def insert(self, model, objects):
+        """bulk_create; возвращает первичные ключи новых строк."""
+        before = model.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        model.objects.bulk_create(objects)
+        return list(model.objects.filter(pk__gt=before).order_by(
+            'pk'
+        ).values_list('pk', flat=True))
+
+    def create_users(self):
+        password = make_password(None)
+        prefix = uuid.uuid4().hex[:6]
+        users = []
+        for numbers in self.batches(self.options['users']):
+            users += self.insert(User, [
+                User(
+                    username=f'load_{prefix}_{number}',
+                    first_name=self.faker.first_name(),
+                    last_name=self.faker.last_name(),
+                    email=f'load_{prefix}_{number}@example.com',
+                    password=password,
+                )
+                for number in numbers
+            ])
+        return users
+
+    def create_groups(self):
+        prefix = uuid.uuid4().hex[:6]
+        return self.insert(Group, [
+            Group(
+                title=self.faker.catch_phrase()[:200],
+                slug=f'load-{prefix}-{number}',
+                description=self.text(3),
+            )
+            for number in range(self.options['groups'])
+        ])
+
+    def create_posts(self, users, groups, weights):
+        posts = []
+        with explicit_dates(Post._meta.get_field('pub_date')):
+            for numbers in self.batches(self.options['posts']):
+                authors = self.random.choices(
+                    users, cum_weights=weights, k=len(numbers)
+                )
+                posts += self.insert(Post, [
+                    Post(
+                        author_id=author,
+                        group_id=(
+                            self.random.choice(groups)
+                            if groups and self.random.random() < 0.7
+                            else None
+                        ),
+                        text=self.text(self.random.randint(1, 8)),
+                        pub_date=self.date(),
+                    )
+                    for author in authors
+                ])
+        return posts
+
+    def create_comments(self, users, posts):
+        if not posts:
+            return
+        with explicit_dates(Comment._meta.get_field('created')):
+            for numbers in self.batches(self.options['comments']):
+                Comment.objects.bulk_create([
+                    Comment(
+                        post_id=self.random.choice(posts),
+                        author_id=self.random.choice(users),
+                        text=self.text(self.random.randint(1, 3)),
+                        created=self.date(),
+                    )
+                    for _ in numbers
+                ])
+
+    def create_follows(self, users, weights):
+        mean = self.options['follows']
+        follows = []
+        for user in users:
+            count = min(
+                int(self.random.expovariate(1 / mean)) if mean else 0,
+                len(users) - 1,
+            )
+            authors = set(self.random.choices(
+                users, cum_weights=weights, k=count
+            ))
+            authors.discard(user)
+            follows += [
+                Follow(user_id=user, author_id=author) for author in authors
+            ]
+            if len(follows) >= self.options['batch_size']:
+                Follow.objects.bulk_create(follows, ignore_conflicts=True)
+                follows = []
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+
+    def rebuild_timelines(self, users):
+        for user in users:
+            timeline.rebuild(user)
@@ -0,0 +1,45 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры картинок всех постов на всех ядрах'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Число процессов; по умолчанию — число ядер',
+        )
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).order_by().values_list('image', flat=True).distinct().iterator()
+        workers = options['workers']
+        done = 0
+        if workers < 2:
+            for name in names:
+                thumbnails.refresh_pages(thumbnails.generate(name))
+                done += 1
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=thumbnails.init_worker,
+            ) as executor:
+                futures = [
+                    executor.submit(thumbnails.generate, name)
+                    for name in names
+                ]
+                for future in as_completed(futures):
+                    thumbnails.refresh_pages(future.result())
+                    done += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано картинок: {done}')
+        )
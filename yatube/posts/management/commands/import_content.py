@@ -0,0 +1,115 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import IntegrityError, connection, transaction
+
+from posts import counters, search, timeline
+from posts.importer import BATCH_SIZE, KINDS, Importer, read_rows
+from posts.models import Comment, Follow, Group, Post
+
+SHOWN_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии и подписки из JSONL или CSV '
+        '(в том числе .gz) пачками через bulk_create'
+    )
+
+    def add_arguments(self, parser):
+        for kind in KINDS:
+            parser.add_argument(f'--{kind}', metavar='ФАЙЛ')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--skip-search-index', action='store_true',
+            help='Не перестраивать поисковый индекс',
+        )
+
+    def handle(self, *args, **options):
+        kinds = [kind for kind in KINDS if options[kind]]
+        if not kinds:
+            raise CommandError(
+                f'Укажите хотя бы один файл: {", ".join(KINDS)}.'
+            )
+        self.verbosity = options['verbosity']
+        importer = Importer(options['batch_size'])
+        try:
+            for kind in kinds:
+                self.load(importer, kind, options[kind])
+        finally:
+            # Пачки фиксируются по одной: и после сбоя уже записанным
+            # строкам нужны счётчики, ленты и индекс.
+            for kind, line, messages in importer.errors[:SHOWN_ERRORS]:
+                self.stderr.write(
+                    f'{kind}, строка {line}: {" ".join(messages)}'
+                )
+            self.finish(importer, options)
+
+    def load(self, importer, kind, path):
+        started = time.perf_counter()
+        loaded = 0
+        try:
+            for count in importer.run(kind, read_rows(path)):
+                loaded += count
+                if self.verbosity > 1:
+                    self.report(kind, loaded, started)
+        except IntegrityError as error:
+            raise CommandError(
+                f'{kind}: пачка после {loaded} строк не записана: {error}'
+            )
+        errors = sum(1 for error in importer.errors if error[0] == kind)
+        self.report(kind, loaded, started, errors)
+
+    def report(self, kind, loaded, started, errors=None):
+        elapsed = time.perf_counter() - started
+        line = (
+            f'{kind}: {loaded} строк за {elapsed:.1f} с, '
+            f'{loaded / elapsed if elapsed else 0:.0f} строк/с'
+        )
+        if errors is not None:
+            line += f', пропущено с ошибками: {errors}'
+        self.stdout.write(line)
+
+    def finish(self, importer, options):
+        """Всё, что при обычном сохранении делают сигналы, — один раз.
+
+        Пересчитывается только затронутое загрузкой: группы и авторы
+        постов, посты и их комментарии, участники подписок.
+        """
+        posts = importer.loaded_posts()
+        users = importer.authors | importer.followers | importer.followed
+        self.step(
+            'Счётчики', counters.repair,
+            importer.group_set, posts | importer.commented, users,
+        )
+        readers = set(importer.followers)
+        for authors in counters.scoped(
+            Follow.objects.all(), importer.authors, 'author'
+        ):
+            readers.update(authors.values_list('user', flat=True).iterator())
+        self.step('Ленты', self.rebuild_timelines, readers)
+        if not options['skip_search_index']:
+            self.step(
+                'Поисковый индекс', search.reindex,
+                posts | importer.commented,
+            )
+        # Строки со своими id не двигают последовательности ключей.
+        sql = connection.ops.sequence_reset_sql(
+            no_style(), [Group, Post, Comment, Follow]
+        )
+        with connection.cursor() as cursor:
+            for statement in sql:
+                cursor.execute(statement)
+        cache.clear()
+
+    def rebuild_timelines(self, readers):
+        for user_id in readers:
+            timeline.rebuild(user_id)
+
+    def step(self, title, function, *args):
+        started = time.perf_counter()
+        with transaction.atomic():
+            function(*args)
+        self.stdout.write(f'{title}: {time.perf_counter() - started:.1f} с')
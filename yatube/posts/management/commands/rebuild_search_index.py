@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс постов и комментариев'
+
+    def handle(self, *args, **options):
+        created = search.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Записей в индексе: {created}')
+        )
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.19 on 2026-10-18 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_image_size'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThumbnailManifest',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.CharField(max_length=255, unique=True, verbose_name='Картинка')),
+                ('variants', models.TextField(verbose_name='Миниатюры в JSON')),
+            ],
+            options={
+                'verbose_name': 'Миниатюры картинки',
+                'verbose_name_plural': 'Миниатюры картинок',
+            },
+        ),
+    ]
@@ -1,10 +1,20 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.models import AtomicSaveModel, CountersModel
+
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
-class Post(models.Model):
+class PostQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Всё, что нужно карточке поста, одним запросом."""
+        return self.select_related('author', 'group')
+
+
+class Post(CountersModel, AtomicSaveModel):
     text = models.TextField(
         null=False,
         blank=False,
@@ -34,11 +44,29 @@ class Post(models.Model):
     )
     image = models.ImageField(
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True,
         null=True,
+        db_index=True,
         verbose_name='Картинка',
         help_text='Добавьте картинку'
     )
+    # Размеры после обработки в posts.images: шаблонам не нужно
+    # открывать файл.
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки', null=True, blank=True, editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки', null=True, blank=True, editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False
+    )
+    counter_fields = ('comments_count',)
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:15]
@@ -47,9 +75,23 @@ class Post(models.Model):
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+        ]
 
 
-class Group(models.Model):
+class Group(CountersModel):
     title = models.CharField(
         max_length=200,
         null=False,
@@ -65,12 +107,18 @@ class Group(models.Model):
         null=True,
         verbose_name='Описание'
     )
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0,
+        editable=False
+    )
+    counter_fields = ('posts_count',)
 
     def __str__(self):
         return self.title
 
 
-class Comment(models.Model):
+class Comment(AtomicSaveModel):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -96,11 +144,20 @@ class Comment(models.Model):
         auto_now_add=True
     )
 
+    class Meta:
+        ordering = ['created']
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.text[:15]
 
 
-class Follow(models.Model):
+class Follow(AtomicSaveModel):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -117,3 +174,117 @@ class Follow(models.Model):
         verbose_name='Автор',
         related_name='following'
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='follow_unique_user_author',
+            ),
+        ]
+
+
+class UserStats(CountersModel):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    counter_fields = ('posts_count', 'followers_count', 'following_count')
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='timeline_unique_user_post',
+            ),
+        ]
+
+
+class SearchTerm(models.Model):
+    """Запись обратного индекса: основа слова в посте или комментарии."""
+
+    term = models.CharField('Основа слова', max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Пост'
+    )
+    comment = models.ForeignKey(
+        Comment,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='search_terms',
+        verbose_name='Комментарий'
+    )
+    weight = models.PositiveIntegerField('Вес', default=1)
+
+    class Meta:
+        verbose_name = 'Слово индекса'
+        verbose_name_plural = 'Слова индекса'
+        indexes = [
+            models.Index(
+                fields=['term', 'post'],
+                name='search_term_post_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.term
+
+
+class ThumbnailManifest(models.Model):
+    """Все миниатюры одной картинки: размер -> [имя файла, ширина, высота].
+
+    Пишется при построении миниатюр; шаблоны берут отсюда srcset одним
+    запросом на страницу, не спрашивая sorl о каждом размере.
+    """
+
+    image = models.CharField('Картинка', max_length=255, unique=True)
+    variants = models.TextField('Миниатюры в JSON')
+
+    class Meta:
+        verbose_name = 'Миниатюры картинки'
+        verbose_name_plural = 'Миниатюры картинок'
+
+    def __str__(self):
+        return self.image
@@ -0,0 +1,158 @@
+import hashlib
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from core import replicas
+
+INDEX_SCOPE = 'posts'
+GROUP_SCOPE = 'posts:group:{slug}'
+PROFILE_SCOPE = 'posts:profile:{username}'
+POST_SCOPE = 'posts:post:{post_id}'
+
+LOCK_TIMEOUT = 30
+LOCK_WAIT = 2
+LOCK_POLL = 0.05
+
+
+def _scope_key(kind, scope):
+    digest = hashlib.md5(scope.encode()).hexdigest()
+    return f'page_cache:{kind}:{digest}'
+
+
+def _current(kind, scopes):
+    keys = [_scope_key(kind, scope) for scope in scopes]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            # Значение могло вытесниться: новое не должно совпасть
+            # ни с одним из прежних, поэтому берём время.
+            cache.add(key, _now(), None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def _now():
+    return int(time.time() * 1000)
+
+
+def generations(scopes):
+    """Текущие номера поколений областей кэша."""
+    return _current('generation', scopes)
+
+
+def changed_at(scopes):
+    """Время последнего изменения областей в секундах от эпохи."""
+    return max(_current('changed', scopes), default=0) / 1000
+
+
+def bump(*scopes):
+    """Сдвигает поколения: все страницы этих областей устаревают."""
+    scopes = set(scopes)
+    for scope in scopes:
+        key = _scope_key('generation', scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _now(), None)
+    now = _now()
+    cache.set_many(
+        {_scope_key('changed', scope): now for scope in scopes}, None
+    )
+
+
+def post_scopes(post):
+    scopes = [
+        INDEX_SCOPE,
+        PROFILE_SCOPE.format(username=post.author.username),
+        POST_SCOPE.format(post_id=post.pk),
+    ]
+    if post.group_id is not None:
+        scopes.append(GROUP_SCOPE.format(slug=post.group.slug))
+    return scopes
+
+
+def _page_key(request, scopes):
+    if request.user.is_authenticated:
+        variant = f'user:{request.user.pk}'
+    else:
+        variant = 'anon'
+    versions = '.'.join(map(str, generations(scopes)))
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page_cache:page:{versions}:{variant}:{path}'
+
+
+def _fresh(entry):
+    created, content, content_type = entry
+    return time.time() - created < settings.PAGE_CACHE_TIMEOUT
+
+
+def cache_listing(*scope_templates):
+    """Кэширует страницу до изменения данных в её областях.
+
+    Области задаются шаблонами с именованными аргументами представления,
+    например `GROUP_SCOPE`. Гости и каждый пользователь получают свои
+    копии. Пересчёт идёт под блокировкой: одну страницу строит один
+    запрос, остальные ждут или отдают устаревшую копию.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            scopes = [
+                template.format(**kwargs) for template in scope_templates
+            ]
+            key = _page_key(request, scopes)
+            entry = cache.get(key)
+            if entry is not None and _fresh(entry):
+                return _response(entry)
+            lock_key = f'{key}:lock'
+            if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+                if entry is not None:
+                    return _response(entry)
+                entry = _wait_for(key)
+                if entry is not None:
+                    return _response(entry)
+                return view(request, *args, **kwargs)
+            try:
+                replicas.fresh_reads(lambda: changed_at(scopes))
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200 and not response.streaming:
+                    entry = (
+                        time.time(),
+                        response.content,
+                        response['Content-Type'],
+                    )
+                    cache.set(key, entry, _storage_timeout())
+                return response
+            finally:
+                cache.delete(lock_key)
+        return wrapper
+    return decorator
+
+
+def _storage_timeout():
+    # Копия живёт дольше своего срока: пока одна страница пересчитывается,
+    # остальные запросы отдают прежнюю.
+    timeout = settings.PAGE_CACHE_TIMEOUT
+    return timeout + timeout // 10 + random.randint(0, LOCK_TIMEOUT)
+
+
+def _wait_for(key):
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def _response(entry):
+    created, content, content_type = entry
+    return HttpResponse(content, content_type=content_type)
@@ -0,0 +1,188 @@
+import hashlib
+from math import ceil
+
+from django.core import signing
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+ORDERING = ('-pub_date', '-pk')
+CURSOR_SALT = 'posts.paginator'
+APPROXIMATE_COUNT_TIMEOUT = 60
+
+FORWARD = 'f'
+BACKWARD = 'b'
+LAST = 'l'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def cursor_key(row):
+    if isinstance(row, dict):
+        return row['pub_date'], row['id']
+    return row.pub_date, row.pk
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу (pub_date, id) вместо OFFSET.
+
+    Страницы возвращаются обычными `Page`, поэтому шаблоны работают
+    без изменений; ссылки на соседние страницы доступны в
+    `page.next_cursor` и `page.previous_cursor`. Строки могут быть
+    и словарями из `values()` с ключами `pub_date` и `id`.
+    """
+
+    def __init__(self, object_list, per_page, approximate_count=False,
+                 **kwargs):
+        super().__init__(object_list.order_by(*ORDERING), per_page, **kwargs)
+        self.approximate_count = approximate_count
+        self.cursor_number = None
+        self.cursor_has_next = False
+
+    @cached_property
+    def count(self):
+        if not self.approximate_count:
+            return super().count
+        query = str(self.object_list.query).encode()
+        key = 'paginator:count:' + hashlib.md5(query).hexdigest()
+        return cache.get_or_set(
+            key, self.object_list.count, APPROXIMATE_COUNT_TIMEOUT
+        )
+
+    @cached_property
+    def num_pages(self):
+        # После выборки страницы о следующей известно по лишней строке:
+        # устаревшая оценка не должна вести на пустую страницу.
+        if self.cursor_number is None:
+            return max(1, ceil(self.count / self.per_page))
+        return self.cursor_number + int(self.cursor_has_next)
+
+    @property
+    def page_range(self):
+        """Номера для ссылок; с приблизительным счётчиком — по оценке."""
+        pages = self.num_pages
+        if self.approximate_count:
+            pages = max(pages, ceil(self.count / self.per_page))
+        return range(1, pages + 1)
+
+    def get_cursor_page(self, cursor=None):
+        """Страница по курсору; пустой или битый курсор даёт первую."""
+        if not cursor:
+            return self._first_page()
+        try:
+            direction, key, number = self.decode_cursor(cursor)
+        except InvalidCursor:
+            return self._first_page()
+        if direction == FORWARD:
+            return self._forward_page(key, number)
+        if direction == BACKWARD:
+            return self._backward_page(key, number)
+        return self._last_page()
+
+    def encode_cursor(self, direction, post=None, number=1):
+        payload = {'d': direction, 'n': number}
+        if post is not None:
+            pub_date, pk = cursor_key(post)
+            payload['k'] = [pub_date.isoformat(), pk]
+        return signing.dumps(payload, salt=CURSOR_SALT, compress=True)
+
+    def decode_cursor(self, cursor):
+        try:
+            payload = signing.loads(cursor, salt=CURSOR_SALT)
+            direction = payload['d']
+            number = max(1, int(payload['n']))
+            key = None
+            if direction != LAST:
+                pub_date, pk = payload['k']
+                key = (parse_datetime(pub_date), int(pk))
+                if key[0] is None:
+                    raise ValueError(pub_date)
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            raise InvalidCursor(cursor)
+        if direction not in (FORWARD, BACKWARD, LAST):
+            raise InvalidCursor(cursor)
+        return direction, key, number
+
+    def _rows(self, key=None, backward=False):
+        """До per_page + 1 строк после ключа: к старым или, назад, к новым."""
+        rows = self.object_list
+        if key is not None:
+            pub_date, pk = key
+            if backward:
+                rows = rows.filter(
+                    Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+                )
+            else:
+                rows = rows.filter(
+                    Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+                )
+        if backward:
+            rows = rows.reverse()
+        return list(rows[:self.per_page + 1])
+
+    def _first_page(self):
+        rows = self._rows()
+        has_next = len(rows) > self.per_page
+        return self._cursor_page(rows[:self.per_page], 1, has_next)
+
+    def _forward_page(self, key, number):
+        rows = self._rows(key)
+        has_next = len(rows) > self.per_page
+        return self._cursor_page(rows[:self.per_page], number, has_next)
+
+    def _backward_page(self, key, number):
+        rows = self._rows(key, backward=True)
+        if len(rows) <= self.per_page:
+            # Дошли до начала ленты: первая страница всегда полная.
+            return self._first_page()
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return self._cursor_page(rows, max(number, 2), True)
+
+    def _last_page(self):
+        rows = self._rows(backward=True)
+        if len(rows) <= self.per_page:
+            return self._first_page()
+        rows = rows[:self.per_page]
+        rows.reverse()
+        number = max(2, ceil(self.count / self.per_page))
+        return self._cursor_page(rows, number, False)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        rows = self._offset_rows((number - 1) * self.per_page)
+        return self._cursor_page(
+            rows[:self.per_page], number, len(rows) > self.per_page
+        )
+
+    def _offset_rows(self, bottom):
+        """До per_page + 1 строк с `bottom`-й: для ссылок с номером."""
+        return list(self.object_list[bottom:bottom + self.per_page + 1])
+
+    def _cursor_page(self, rows, number, has_next):
+        self.cursor_number = number
+        self.cursor_has_next = has_next
+        self.__dict__.pop('num_pages', None)
+        return self._get_page(rows, number, self)
+
+    def _get_page(self, object_list, number, paginator):
+        object_list = list(object_list)
+        page = super()._get_page(object_list, number, paginator)
+        page.next_cursor = None
+        page.previous_cursor = None
+        page.last_cursor = None
+        if object_list and page.has_next():
+            page.next_cursor = self.encode_cursor(
+                FORWARD, object_list[-1], number + 1
+            )
+        if object_list and number > 1:
+            page.previous_cursor = self.encode_cursor(
+                BACKWARD, object_list[0], number - 1
+            )
+        if self.approximate_count and page.has_next():
+            page.last_cursor = self.encode_cursor(LAST)
+        return page
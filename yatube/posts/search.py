@@ -0,0 +1,115 @@
+import re
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import Comment, Post, SearchTerm
+from .stemmer import stem
+
+WORD = re.compile(r'\w+')
+
+# Слово из текста поста весит больше, чем то же слово в комментарии.
+POST_WEIGHT = 3
+COMMENT_WEIGHT = 1
+
+TERM_LENGTH = SearchTerm._meta.get_field('term').max_length
+
+
+def terms(text):
+    """Основы слов текста в нижнем регистре, с повторами."""
+    return [
+        stem(word)[:TERM_LENGTH]
+        for word in WORD.findall(text.lower())
+        if len(word) > 1 or word.isdigit()
+    ]
+
+
+def _entries(text, weight, **source):
+    return [
+        SearchTerm(term=term, weight=count * weight, **source)
+        for term, count in Counter(terms(text)).items()
+    ]
+
+
+def index_post(post):
+    SearchTerm.objects.filter(post=post, comment=None).delete()
+    SearchTerm.objects.bulk_create(_entries(post.text, POST_WEIGHT, post=post))
+
+
+def index_comment(comment):
+    SearchTerm.objects.filter(comment=comment).delete()
+    SearchTerm.objects.bulk_create(_entries(
+        comment.text, COMMENT_WEIGHT, post_id=comment.post_id, comment=comment
+    ))
+
+
+REBUILD_BATCH = 5000
+# Предел переменных в одном запросе SQLite — 999.
+REINDEX_CHUNK = 900
+
+
+@transaction.atomic
+def rebuild():
+    """Строит индекс заново; возвращает число записей."""
+    SearchTerm.objects.all().delete()
+    return _fill(Post.objects.all(), Comment.objects.all())
+
+
+@transaction.atomic
+def reindex(post_ids):
+    """Строит заново индекс постов `post_ids` и их комментариев."""
+    post_ids = sorted(post_ids)
+    created = 0
+    for start in range(0, len(post_ids), REINDEX_CHUNK):
+        chunk = post_ids[start:start + REINDEX_CHUNK]
+        SearchTerm.objects.filter(post_id__in=chunk).delete()
+        created += _fill(
+            Post.objects.filter(pk__in=chunk),
+            Comment.objects.filter(post_id__in=chunk),
+        )
+    return created
+
+
+def _fill(posts, comments):
+    posts = posts.values_list('pk', 'text')
+    comments = comments.values_list('post_id', 'pk', 'text')
+    sources = (
+        (
+            _entries(text, POST_WEIGHT, post_id=pk)
+            for pk, text in posts.iterator()
+        ),
+        (
+            _entries(
+                text, COMMENT_WEIGHT, post_id=post_id, comment_id=pk
+            )
+            for post_id, pk, text in comments.iterator()
+        ),
+    )
+    created = 0
+    batch = []
+    for source in sources:
+        for entries in source:
+            batch += entries
+            if len(batch) >= REBUILD_BATCH:
+                created += len(SearchTerm.objects.bulk_create(batch))
+                batch = []
+    created += len(SearchTerm.objects.bulk_create(batch))
+    return created
+
+
+def search(query, queryset=None):
+    """Посты, где встречаются все слова запроса, сначала самые подходящие.
+
+    Релевантность — сумма весов найденных слов; при равной релевантности
+    выше свежие посты.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    query_terms = set(terms(query))
+    if not query_terms:
+        return queryset.none()
+    return queryset.filter(search_terms__term__in=query_terms).annotate(
+        matched=Count('search_terms__term', distinct=True),
+        rank=Sum('search_terms__weight'),
+    ).filter(matched=len(query_terms)).order_by('-rank', '-pub_date', '-pk')
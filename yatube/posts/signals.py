@@ -0,0 +1,180 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, images, page_cache, search, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+# Поля пользователя, которые видны в карточках его постов.
+USER_CARD_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=User)
+def user_changing(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._saved_names = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(
+        USER_CARD_FIELDS
+    ):
+        return
+    instance._saved_names = User.objects.filter(pk=instance.pk).values_list(
+        *USER_CARD_FIELDS
+    ).first()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+        return
+    saved = getattr(instance, '_saved_names', None)
+    names = tuple(getattr(instance, field) for field in USER_CARD_FIELDS)
+    if saved is None or saved == names:
+        return
+    # Имя автора есть в карточках всех его постов во всех лентах.
+    slugs = Group.objects.filter(posts__author=instance).values_list(
+        'slug', flat=True
+    ).distinct()
+    # И в комментариях на страницах постов.
+    commented = Comment.objects.filter(author=instance).values_list(
+        'post_id', flat=True
+    ).distinct()
+    bump_after_commit(
+        page_cache.INDEX_SCOPE,
+        page_cache.PROFILE_SCOPE.format(username=saved[0]),
+        page_cache.PROFILE_SCOPE.format(username=instance.username),
+        *(page_cache.GROUP_SCOPE.format(slug=slug) for slug in slugs),
+        *(page_cache.POST_SCOPE.format(post_id=pk) for pk in commented),
+    )
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, raw=False, **kwargs):
+    instance._saved_state = None
+    if not raw and not instance._state.adding:
+        instance._saved_state = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('author_id', 'group_id', 'image', 'text').first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    bump_after_commit(*page_cache.post_scopes(instance))
+    if created:
+        counters.change_user_counter(instance.author_id, 'posts_count', 1)
+        counters.change_group_counter(instance.group_id, 1)
+        timeline.fan_out(instance)
+        thumbnails.enqueue(instance.image.name)
+        search.index_post(instance)
+        return
+    saved = getattr(instance, '_saved_state', None)
+    if saved is None:
+        return
+    author_id, group_id, image, text = saved
+    if image != instance.image.name:
+        thumbnails.enqueue(instance.image.name)
+        release_image(image)
+    if text != instance.text:
+        search.index_post(instance)
+    if author_id != instance.author_id:
+        counters.change_user_counter(author_id, 'posts_count', -1)
+        counters.change_user_counter(instance.author_id, 'posts_count', 1)
+        for username in User.objects.filter(pk=author_id).values_list(
+            'username', flat=True
+        ):
+            bump_after_commit(
+                page_cache.PROFILE_SCOPE.format(username=username)
+            )
+    if group_id != instance.group_id:
+        counters.change_group_counter(group_id, -1)
+        counters.change_group_counter(instance.group_id, 1)
+        for slug in Group.objects.filter(pk=group_id).values_list(
+            'slug', flat=True
+        ):
+            bump_after_commit(page_cache.GROUP_SCOPE.format(slug=slug))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_user_counter(instance.author_id, 'posts_count', -1)
+    counters.change_group_counter(instance.group_id, -1)
+    bump_after_commit(*page_cache.post_scopes(instance))
+    release_image(instance.image.name)
+
+
+def bump_after_commit(*scopes):
+    """Сдвигает поколения кэша страниц сразу и после фиксации.
+
+    Страницу, которую параллельный запрос построил по данным до
+    фиксации, сохранят под промежуточным поколением, и второй сдвиг её
+    отбросит. Первый нужен своей транзакции: в ней, как и в тестах
+    внутри транзакции, страницы уже должны обновиться.
+    """
+    page_cache.bump(*scopes)
+    transaction.on_commit(lambda: page_cache.bump(*scopes))
+
+
+def release_image(name):
+    """Файл картинки удаляется после фиксации, если он больше ничей."""
+    if name:
+        transaction.on_commit(lambda: images.release(name))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_after_commit(
+            page_cache.INDEX_SCOPE,
+            page_cache.GROUP_SCOPE.format(slug=instance.slug),
+        )
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_post_counter(instance.post_id, 1)
+    if not raw:
+        search.index_comment(instance)
+        bump_after_commit(*page_cache.post_scopes(instance.post))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_post_counter(instance.post_id, -1)
+    bump_after_commit(*page_cache.post_scopes(instance.post))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user_counter(instance.author_id, 'followers_count', 1)
+        counters.change_user_counter(instance.user_id, 'following_count', 1)
+        timeline.followers_changed(instance.author_id, 1)
+        timeline.backfill(instance.user, instance.author)
+        bump_after_commit(*follow_scopes(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_user_counter(instance.author_id, 'followers_count', -1)
+    counters.change_user_counter(instance.user_id, 'following_count', -1)
+    timeline.followers_changed(instance.author_id, -1)
+    timeline.prune(instance.user_id, instance.author_id)
+    bump_after_commit(*follow_scopes(instance))
+
+
+def follow_scopes(follow):
+    # У автора меняется число подписчиков, у читателя — число подписок.
+    return [
+        page_cache.PROFILE_SCOPE.format(username=follow.author.username),
+        page_cache.PROFILE_SCOPE.format(username=follow.user.username),
+    ]
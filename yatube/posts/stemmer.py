@@ -0,0 +1,127 @@
+"""Стеммер русского языка по алгоритму Snowball (Портер)."""
+import re
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+
+
+def _table(groups):
+    """Окончание -> нужна ли перед ним «а» или «я»."""
+    return {
+        ending: after_a
+        for endings, after_a in groups
+        for ending in endings
+    }
+
+
+PERFECTIVE_GERUND = _table((
+    (('в', 'вши', 'вшись'), True),
+    (('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'), False),
+))
+ADJECTIVE = _table((
+    (('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+      'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+      'ая', 'яя', 'ою', 'ею'), False),
+))
+PARTICIPLE = _table((
+    (('ем', 'нн', 'вш', 'ющ', 'щ'), True),
+    (('ивш', 'ывш', 'ующ'), False),
+))
+REFLEXIVE = _table((
+    (('ся', 'сь'), False),
+))
+VERB = _table((
+    (('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+      'ет', 'ют', 'ны', 'ть', 'ешь', 'нно'), True),
+    (('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+      'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует',
+      'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'), False),
+))
+NOUN = _table((
+    (('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+      'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+      'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+      'ья', 'я'), False),
+))
+DERIVATIONAL = ('ость', 'ост')
+SUPERLATIVE = ('ейше', 'ейш')
+
+CYRILLIC = re.compile('^[а-я]+$')
+MAX_ENDING = max(map(len, {**PERFECTIVE_GERUND, **VERB, **NOUN}))
+
+
+def _strip(word, table):
+    """Отрезает самое длинное окончание из таблицы; None — если не вышло.
+
+    Часть окончаний отрезается только после «а» или «я».
+    """
+    for length in range(min(MAX_ENDING, len(word)), 0, -1):
+        after_a = table.get(word[-length:])
+        if after_a is None:
+            continue
+        rest = word[:-length]
+        if after_a and not rest.endswith(('а', 'я')):
+            return None
+        return rest
+    return None
+
+
+def _region(word, start=0):
+    """Начало области после первой согласной, следующей за гласной."""
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def _strip_ending(rv):
+    rest = _strip(rv, PERFECTIVE_GERUND)
+    if rest is not None:
+        return rest
+    reflexive = _strip(rv, REFLEXIVE)
+    if reflexive is not None:
+        rv = reflexive
+    rest = _strip(rv, ADJECTIVE)
+    if rest is not None:
+        participle = _strip(rest, PARTICIPLE)
+        return rest if participle is None else participle
+    for groups in (VERB, NOUN):
+        rest = _strip(rv, groups)
+        if rest is not None:
+            return rest
+    return rv
+
+
+def _tidy_up(rv):
+    if rv.endswith('нн'):
+        return rv[:-1]
+    for ending in SUPERLATIVE:
+        if rv.endswith(ending):
+            rv = rv[:-len(ending)]
+            return rv[:-1] if rv.endswith('нн') else rv
+    if rv.endswith('ь'):
+        return rv[:-1]
+    return rv
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC.match(word):
+        return word
+    first_vowel = next(
+        (index for index, letter in enumerate(word) if letter in VOWELS),
+        None,
+    )
+    if first_vowel is None:
+        return word
+    head, rv = word[:first_vowel + 1], word[first_vowel + 1:]
+    r2 = _region(word, _region(word)) - len(head)
+    rv = _strip_ending(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    for ending in DERIVATIONAL:
+        if rv.endswith(ending) and len(rv) - len(ending) >= r2:
+            rv = rv[:-len(ending)]
+            break
+    return head + _tidy_up(rv)
@@ -0,0 +1,58 @@
+import hashlib
+import os
+import re
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+
+
+def digest(content):
+    """SHA-256 содержимого файла, читая его кусками."""
+    sha = hashlib.sha256()
+    for chunk in content.chunks():
+        sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Файлы под именем из хэша содержимого: `posts/ab/cd/<sha256>.jpg`.
+
+    Одинаковые загрузки получают одно имя и один файл, а с ним общие
+    миниатюры. Производные файлы (например, WebP-вариант оригинала)
+    пишутся под именем оригинала через save_variant.
+    """
+
+    def __init__(self, prefix='posts', **kwargs):
+        super().__init__(**kwargs)
+        self.prefix = prefix
+        self.pattern = re.compile(
+            rf'{re.escape(prefix)}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/[0-9a-f]{{64}}'
+            r'\.\w+'
+        )
+
+    def content_name(self, sha, extension):
+        return f'{self.prefix}/{sha[:2]}/{sha[2:4]}/{sha}{extension.lower()}'
+
+    def is_content_name(self, name):
+        return self.pattern.fullmatch(name) is not None
+
+    def get_available_name(self, name, max_length=None):
+        # Имя выбирает _save по содержимому.
+        return name
+
+    def _save(self, name, content):
+        name = self.content_name(digest(content), os.path.splitext(name)[1])
+        if self.exists(name):
+            # Свежая дата защищает файл от clean_media, пока пост с ним
+            # ещё не сохранён.
+            os.utime(self.path(name))
+            return name
+        return self.save_variant(name, content)
+
+    def save_variant(self, name, content):
+        """Пишет файл ровно под именем `name`, заменяя прежний."""
+        # Запись во временный файл и атомарное переименование: при
+        # одновременной записи того же содержимого файл не побьётся.
+        temp = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        os.replace(self.path(temp), self.path(name))
+        return name
@@ -0,0 +1,27 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from .. import cards, thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post):
+    """Карточка поста из кэша.
+
+    Первый вызов на странице забирает из кэша карточки всех постов
+    `page_obj` одним get_many, а миниатюры тех, кого там нет, — одним
+    запросом к манифестам.
+    """
+    page = context.render_context.get('post_cards')
+    if page is None:
+        page_obj = context.get('page_obj')
+        posts = page_obj.object_list if page_obj is not None else [post]
+        page_cards = cards.cached_cards(posts)
+        manifests = thumbnails.manifests(
+            post.image.name for post in posts
+            if cards.card_key(post) not in page_cards
+        )
+        page = context.render_context['post_cards'] = (page_cards, manifests)
+    return mark_safe(cards.render_card(post, *page))
@@ -0,0 +1,55 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from .. import cards, thumbnails
+
+register = template.Library()
+
+PLACEHOLDER = 'img/placeholder.svg'
+# Ширина картинки на странице: колонка не шире 960px.
+SIZES = '(min-width: 992px) 960px, 100vw'
+
+
+@register.simple_tag
+def post_image(image, manifests=None, width=None):
+    """<img> картинки поста со srcset по размерам POST_THUMBNAILS.
+
+    Миниатюры берутся из манифеста: `manifests` уже загружены для всей
+    страницы (thumbnails.manifests), иначе это один запрос. Сам тег
+    картинки не обрабатывает, а пока их строит thumbnails.enqueue,
+    показывает заглушку. `width` — ширина оригинала (Post.image_width):
+    миниатюры шире него только растянуты и в srcset не попадают.
+    """
+    if not image:
+        return ''
+    # Без манифестов страницы (или без такой переменной) — свой запрос.
+    if not isinstance(manifests, dict):
+        manifests = thumbnails.manifests([image.name])
+    variants = manifests.get(image.name, {})
+    if cards.THUMBNAIL not in variants:
+        width, _, height = cards.THUMBNAIL.partition('x')
+        return format_html(
+            '<img class="card-img my-2" src="{}" width="{}" height="{}">',
+            static(PLACEHOLDER), width, height,
+        )
+    srcset = sorted(
+        (variant.width, variant.url)
+        for geometry, variant in variants.items()
+        if geometry in settings.POST_THUMBNAILS
+    )
+    if width:
+        srcset = [
+            (size, url) for size, url in srcset if size <= width
+        ] or srcset[:1]
+    main = variants[cards.THUMBNAIL]
+    return format_html(
+        '<img class="card-img my-2" src="{}" srcset="{}" sizes="{}" '
+        'width="{}" height="{}">',
+        main.url,
+        format_html_join(', ', '{} {}w', (
+            (url, width) for width, url in srcset
+        )),
+        SIZES, main.width, main.height,
+    )
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -64,7 +65,11 @@ class FormTests(TestCase):
         form_fields = {
             'text': 'Тестовый пост',
             'group': FormTests.group.id,
-            'image': FormTests.uploaded,
+            'image': SimpleUploadedFile(
+                name='new.gif',
+                content=FormTests.small_gif,
+                content_type='image/gif'
+            ),
         }
         response = self.authorized_client.post(
             reverse('posts:post_create'),
@@ -81,7 +86,9 @@ class FormTests(TestCase):
                 text='Тестовый пост',
                 author=FormTests.user,
                 group=FormTests.group.id,
-                image='posts/small.gif',
+                image=Post.image.field.storage.content_name(
+                    hashlib.sha256(FormTests.small_gif).hexdigest(), '.gif'
+                ),
             ).exists()
         )
 
@@ -1,6 +1,9 @@
+import os
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
-from posts.models import Group, Post
+from posts.models import Comment, Follow, Group, Post, UserStats
 
 User = get_user_model()
 
@@ -55,3 +58,83 @@ class PostModelTest(TestCase):
             with self.subTest(value=value):
                 self.assertEqual(
                     task._meta.get_field(value).verbose_name, expected)
+
+
+class CountersTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.post = Post.objects.create(
+            author=self.author,
+            text='Тестовый пост',
+            group=self.group,
+        )
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_counters(self):
+        """Счётчики постов автора и группы следуют за постами."""
+        self.group.refresh_from_db()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.post.group = None
+        self.post.save()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_comment_counter(self):
+        """Счётчик комментариев поста учитывает удаление автора."""
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.reader.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_follow_counters(self):
+        """Счётчики подписчиков и подписок."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_save_keeps_concurrent_increments(self):
+        """save() объекта, прочитанного раньше, не затирает счётчики."""
+        stale_post = Post.objects.get(pk=self.post.pk)
+        stale_group = Group.objects.get(pk=self.group.pk)
+        stale_stats = self.stats(self.author)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        Post.objects.create(author=self.author, text='Ещё', group=self.group)
+        stale_post.text = 'Новый текст'
+        stale_post.save()
+        stale_group.title = 'Новое название'
+        stale_group.save()
+        stale_stats.save()
+        self.post.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(self.post.text, 'Новый текст')
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.group.title, 'Новое название')
+        self.assertEqual(self.group.posts_count, 2)
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+
+    def test_recount_repairs_drift(self):
+        """Команда recount_counters исправляет расхождения."""
+        UserStats.objects.filter(user=self.author).update(posts_count=7)
+        Group.objects.update(posts_count=3)
+        UserStats.objects.filter(user=self.reader).delete()
+        call_command('recount_counters', stdout=open(os.devnull, 'w'))
+        self.group.refresh_from_db()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
@@ -1,9 +1,35 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
 from django import forms
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from posts.models import Follow, Group, Post
+from django.utils import timezone
+from PIL import Image
+
+from core.testing import assert_max_queries
+from posts import cards, images, page_cache, search, thumbnails
+from posts.models import (
+    Comment, Follow, Group, Post, ThumbnailManifest, TimelineEntry,
+)
+from posts.paginator import CursorPaginator
+from posts.timeline import TimelinePaginator
 
 User = get_user_model()
 
@@ -109,6 +135,15 @@ class ViewsTests(TestCase):
         object_post = response.context['post']
         self.assertEqual(object_post.text, ViewsTests.post.text)
 
+    def test_explain_queries_covers_views(self):
+        """Команда explain_queries печатает планы запросов страниц."""
+        out = StringIO()
+        call_command('explain_queries', stdout=out)
+        for view_name in ('posts:index', 'posts:group_posts',
+                          'posts:profile', 'posts:post_detail'):
+            with self.subTest(view_name=view_name):
+                self.assertIn(f'== {view_name}', out.getvalue())
+
     def test_create_post_show_correct_context(self):
         """Шаблон post_create сформирован с правильным контекстом."""
         response = self.authorized_client.get(reverse('posts:post_create'))
@@ -170,18 +205,113 @@ class PaginatorViewsTest(TestCase):
             reverse('posts:index') + '?page=2')
         self.assertEqual(len(response.context['page_obj']), 3)
 
+    def test_cursor_pages(self):
+        """Курсоры ведут на следующую и предыдущую страницы"""
+        response = self.authorized_client.get(reverse('posts:index'))
+        first_page = response.context['page_obj']
+        response = self.authorized_client.get(
+            reverse('posts:index'), {'cursor': first_page.next_cursor}
+        )
+        second_page = response.context['page_obj']
+        self.assertEqual(len(second_page), 3)
+        self.assertEqual(second_page.number, 2)
+        self.assertFalse(second_page.has_next())
+        response = self.authorized_client.get(
+            reverse('posts:index'), {'cursor': second_page.previous_cursor}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']), list(first_page)
+        )
+
+    def test_cursor_page_has_no_offset(self):
+        """Страница по курсору не использует OFFSET"""
+        response = self.authorized_client.get(reverse('posts:index'))
+        cursor = response.context['page_obj'].next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(
+                reverse('posts:index'), {'cursor': cursor}
+            )
+        self.assertFalse(
+            any('OFFSET' in query['sql'] for query in queries)
+        )
+
+    def test_stale_count_does_not_add_next_page(self):
+        """Устаревший приблизительный счётчик не даёт ссылки вперёд"""
+        CursorPaginator(Post.objects.all(), 10, approximate_count=True).count
+        Post.objects.filter(
+            pk__in=Post.objects.order_by('pk').values('pk')[:3]
+        ).delete()
+        pages = CursorPaginator(
+            Post.objects.all(), 10, approximate_count=True
+        )
+        for page in (pages.get_cursor_page(), pages.page(1)):
+            self.assertEqual(len(page), 10)
+            self.assertFalse(page.has_next())
+            self.assertIsNone(page.next_cursor)
+        self.assertEqual(pages.page_range, range(1, 3))
+
+    def test_broken_cursor_shows_first_page(self):
+        """Испорченный курсор открывает первую страницу"""
+        response = self.authorized_client.get(
+            reverse('posts:index'), {'cursor': 'broken'}
+        )
+        self.assertEqual(response.context['page_obj'].number, 1)
+        self.assertEqual(len(response.context['page_obj']), 10)
+
     def test_cache_home_page(self):
-        """Кеш на главной работает правильно"""
+        """Главная отдаётся из кэша, пока посты не меняются"""
         response = self.client.get(reverse('posts:index'))
         object_index1 = response.content
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.content, object_index1)
         Post.objects.all().delete()
         response = self.client.get(reverse('posts:index'))
-        object_index2 = response.content
-        self.assertEqual(object_index1, object_index2)
+        self.assertNotEqual(response.content, object_index1)
+
+    def test_cache_variants_are_separate(self):
+        """Гости и пользователи получают разные копии страницы"""
+        guest = self.client.get(reverse('posts:index')).content
+        user = self.authorized_client.get(reverse('posts:index')).content
+        self.assertNotEqual(guest, user)
+        self.assertIn(self.user.username.encode(), user)
+
+    def test_new_post_invalidates_listings(self):
+        """Новый пост сразу виден на закэшированных страницах"""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+        ]
+        for url in urls:
+            self.client.get(url)
+        Post.objects.create(
+            author=self.user, text='Свежий пост', group=self.group
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Свежий пост')
+
+
+class PageCacheCommitTest(TransactionTestCase):
+    def setUp(self):
         cache.clear()
-        response = self.client.get(reverse('posts:index'))
-        object_index3 = response.content
-        self.assertNotEqual(object_index3, object_index1)
+        self.user = User.objects.create_user(username='auth')
+        self.url = reverse('posts:index')
+
+    def test_page_rendered_before_commit_is_dropped(self):
+        """Страница, построенная до фиксации, после неё не отдаётся."""
+        with transaction.atomic():
+            post = Post.objects.create(author=self.user, text='Черновик')
+            inside = page_cache.generations([page_cache.INDEX_SCOPE])
+            # Страница строится и кэшируется, пока транзакция открыта.
+            self.assertContains(self.client.get(self.url), 'Черновик')
+            # Правка без сигналов: сама поколения не сдвигает.
+            Post.objects.filter(pk=post.pk).update(text='Итог')
+        self.assertNotEqual(
+            page_cache.generations([page_cache.INDEX_SCOPE]), inside
+        )
+        self.assertContains(self.client.get(self.url), 'Итог')
 
 
 class FollowTest(TestCase):
@@ -221,6 +351,18 @@ class FollowTest(TestCase):
         )
         self.assertEqual(Follow.objects.all().count(), 0)
 
+    def test_follow_updates_follower_profile(self):
+        """Подписка меняет число подписок в профиле читателя."""
+        cache.clear()
+        url = reverse(
+            'posts:profile', kwargs={'username': self.user_follower.username}
+        )
+        self.assertContains(self.client.get(url), 'подписок: 0')
+        Follow.objects.create(
+            user=self.user_follower, author=self.user_following
+        )
+        self.assertContains(self.client.get(url), 'подписок: 1')
+
     def test_follow_index(self):
         Follow.objects.create(
             user=self.user_follower,
@@ -229,3 +371,938 @@ class FollowTest(TestCase):
         response = self.client_auth_follower.get('/follow/')
         post_text = response.context['page_obj'][0].text
         self.assertEqual(post_text, self.post.text)
+
+    def test_new_post_in_follower_timeline(self):
+        """Новый пост автора попадает в ленту подписчика"""
+        Follow.objects.create(
+            user=self.user_follower,
+            author=self.user_following
+        )
+        post = Post.objects.create(
+            author=self.user_following,
+            text='Новый пост',
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.user_follower, post=post
+            ).exists()
+        )
+        response = self.client_auth_follower.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], post)
+
+    def test_unfollow_prunes_timeline(self):
+        """После отписки посты автора пропадают из ленты"""
+        follow = Follow.objects.create(
+            user=self.user_follower,
+            author=self.user_following
+        )
+        follow.delete()
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.user_follower).exists()
+        )
+        response = self.client_auth_follower.get(reverse('posts:follow_index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    @override_settings(TIMELINE_LENGTH=2)
+    def test_timeline_is_bounded(self):
+        """Лента подписчика хранит ограниченное число записей"""
+        Follow.objects.create(
+            user=self.user_follower,
+            author=self.user_following
+        )
+        for number in range(3):
+            Post.objects.create(
+                author=self.user_following,
+                text=f'Пост {number}',
+            )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user_follower).count(), 2
+        )
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=1)
+    def test_celebrity_posts_read_on_demand(self):
+        """Посты знаменитостей читаются напрямую, без раскладки"""
+        Follow.objects.create(
+            user=self.user_follower,
+            author=self.user_following
+        )
+        self.assertFalse(TimelineEntry.objects.exists())
+        response = self.client_auth_follower.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], self.post)
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=2)
+    def test_former_celebrity_posts_stay_in_timeline(self):
+        """Посты времён славы остаются в ленте и после отписок"""
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(
+            user=self.user_follower, author=self.user_following
+        )
+        Follow.objects.create(user=fan, author=self.user_following)
+        self.assertFalse(TimelineEntry.objects.exists())
+        famous = Post.objects.create(
+            author=self.user_following, text='Пост знаменитости'
+        )
+        Follow.objects.get(user=fan).delete()
+        self.assertCountEqual(
+            TimelineEntry.objects.filter(
+                user=self.user_follower
+            ).values_list('post', flat=True),
+            [self.post.pk, famous.pk],
+        )
+        response = self.client_auth_follower.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], famous)
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=2)
+    def test_timeline_pages_merge_celebrity_posts(self):
+        """Страницы ленты сливают записи ленты с постами знаменитостей"""
+        celebrity = User.objects.create_user(username='celebrity')
+        fan = User.objects.create_user(username='fan')
+        for user, author in (
+            (fan, celebrity),
+            (self.user_follower, celebrity),
+            (self.user_follower, self.user_following),
+        ):
+            Follow.objects.create(user=user, author=author)
+        for number in range(3):
+            Post.objects.create(author=celebrity, text=f'Звезда {number}')
+            Post.objects.create(
+                author=self.user_following, text=f'Пост {number}'
+            )
+        self.assertFalse(TimelineEntry.objects.filter(
+            post__author=celebrity
+        ).exists())
+        expected = list(Post.objects.order_by('-pub_date', '-pk'))
+        pages = TimelinePaginator(Post.objects.all(), 3, self.user_follower)
+        page = pages.get_cursor_page()
+        shown = list(page)
+        while page.next_cursor:
+            page = pages.get_cursor_page(page.next_cursor)
+            shown += list(page)
+        self.assertEqual(shown, expected)
+        previous = pages.get_cursor_page(page.previous_cursor)
+        self.assertEqual(list(previous), expected[3:6])
+        self.assertEqual(list(pages.page(2)), expected[3:6])
+
+
+class QueryBudgetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(title='group', slug='slug')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.post = Post.objects.create(
+            author=self.author, text='Тестовый пост', group=self.group
+        )
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        self.client.force_login(self.reader)
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+            reverse('posts:follow_index'),
+        ]
+
+    def add_rows(self, prefix):
+        for number in range(12):
+            group = Group.objects.create(
+                title=f'group {number}', slug=f'{prefix}slug-{number}'
+            )
+            Post.objects.create(
+                author=self.author, text=f'Пост {number}', group=group
+            )
+            commenter = User.objects.create_user(
+                username=f'{prefix}user{number}'
+            )
+            Comment.objects.create(
+                post=self.post, author=commenter, text=f'Ответ {number}'
+            )
+            Follow.objects.create(user=self.reader, author=commenter)
+            Post.objects.create(
+                author=commenter, text=f'Пост {number}', group=self.group
+            )
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return len(queries)
+
+    def test_queries_do_not_grow_with_rows(self):
+        """Число запросов страниц не зависит от числа записей."""
+        # С первого замера у лент уже есть вторая страница и её ссылки.
+        self.add_rows('a')
+        budgets = {url: self.count_queries(url) for url in self.urls}
+        self.add_rows('b')
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                cache.clear()
+                with assert_max_queries(budget):
+                    self.client.get(url)
+
+    def test_assert_max_queries_reports_queries(self):
+        """assert_max_queries перечисляет лишние запросы."""
+        with self.assertRaisesMessage(AssertionError, 'допустимо: 0'):
+            with assert_max_queries(0):
+                list(Post.objects.all())
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        self.url = reverse('posts:post_detail', args=[self.post.pk])
+
+    def test_placeholder_until_thumbnail_ready(self):
+        """Шаблон не строит миниатюру, а показывает заглушку."""
+        response = self.client.get(self.url)
+        self.assertContains(response, 'img/placeholder.svg')
+        thumbnails.generate(self.post.image.name)
+        thumbnails.refresh_pages(self.post.image.name)
+        response = self.client.get(self.url)
+        self.assertNotContains(response, 'img/placeholder.svg')
+        variants = thumbnails.manifests([self.post.image.name])[
+            self.post.image.name
+        ]
+        self.assertContains(response, f'src="{variants["960x339"].url}"')
+        for variant in variants.values():
+            self.assertContains(
+                response, f'{variant.url} {variant.width}w'
+            )
+
+    def test_srcset_skips_upscaled_thumbnails(self):
+        """Миниатюры шире оригинала не попадают в srcset."""
+        Post.objects.filter(pk=self.post.pk).update(image_width=800)
+        thumbnails.generate(self.post.image.name)
+        variants = thumbnails.manifests([self.post.image.name])[
+            self.post.image.name
+        ]
+        response = self.client.get(self.url)
+        for geometry in ('480x170', '720x254'):
+            variant = variants[geometry]
+            self.assertContains(response, f'{variant.url} {variant.width}w')
+        for geometry in ('960x339', '1440x508'):
+            variant = variants[geometry]
+            self.assertNotContains(
+                response, f'{variant.url} {variant.width}w'
+            )
+
+    def test_listing_reads_manifests_once(self):
+        """Лента берёт миниатюры всех постов одним запросом."""
+        for number in range(3):
+            post = Post.objects.create(
+                author=self.user, text=f'Пост {number}',
+                image=SimpleUploadedFile(
+                    f'small{number}.gif', SMALL_GIF, 'image/gif'
+                ),
+            )
+            thumbnails.generate(post.image.name)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('posts:index'))
+        manifest_queries = [
+            query for query in captured.captured_queries
+            if 'posts_thumbnailmanifest' in query['sql']
+        ]
+        self.assertEqual(len(manifest_queries), 1)
+        # У поста из setUp та же по содержимому картинка.
+        self.assertContains(response, 'srcset=', count=4)
+
+    def test_new_image_is_queued(self):
+        """Новая картинка ставится в очередь, правка текста — нет."""
+        with mock.patch('posts.thumbnails.enqueue') as enqueue:
+            self.post.text = 'Новый текст'
+            self.post.save()
+            enqueue.assert_not_called()
+            self.post.image = SimpleUploadedFile(
+                'other.jpg', jpeg((2, 2)), 'image/jpeg'
+            )
+            self.post.save()
+            enqueue.assert_called_once_with(self.post.image.name)
+
+    def test_generate_thumbnails_command(self):
+        """Команда строит миниатюры существующих картинок."""
+        out = StringIO()
+        call_command('generate_thumbnails', workers=1, stdout=out)
+        self.assertIn('Обработано картинок: 1', out.getvalue())
+        self.assertIn(
+            self.post.image.name,
+            thumbnails.manifests([self.post.image.name]),
+        )
+
+    @override_settings(THUMBNAIL_QUEUE='process')
+    def test_process_pool_uses_active_database(self):
+        """Процессы пула открывают ту же базу, что и родитель."""
+        self.addCleanup(setattr, thumbnails, '_executor', None)
+        thumbnails._executor = None
+        with mock.patch.object(thumbnails, 'ProcessPoolExecutor') as pool:
+            thumbnails.get_executor()
+        (databases,) = pool.call_args[1]['initargs']
+        self.assertEqual(
+            databases['default'], connection.settings_dict['NAME']
+        )
+
+
+def jpeg(size, orientation=None):
+    """JPEG заданного размера, при желании с поворотом в EXIF."""
+    options = {}
+    if orientation is not None:
+        options['exif'] = Image.Exif()
+        options['exif'][images.EXIF_ORIENTATION] = orientation
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'JPEG', **options)
+    return buffer.getvalue()
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_MAX_SIDE=100,
+    POST_IMAGE_VARIANTS=('webp',),
+)
+class ImagePipelineTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.client.force_login(self.user)
+
+    def create(self, content, name='photo.jpg'):
+        return Post.objects.create(
+            author=self.user, text='Фото',
+            image=SimpleUploadedFile(name, content, 'image/jpeg'),
+        )
+
+    def test_process_downscales_and_strips_metadata(self):
+        """Оригинал повёрнут по EXIF, уменьшен и без метаданных."""
+        post = self.create(jpeg((400, 200), orientation=6))
+        name = images.process(post.image.name)
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, name)
+        self.assertEqual((post.image_width, post.image_height), (50, 100))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (50, 100))
+            self.assertNotIn('exif', image.info)
+        with Image.open(images.variant_name(post.image.path, 'webp')) as webp:
+            self.assertEqual((webp.format, webp.size), ('WEBP', (50, 100)))
+
+    def test_small_image_kept_as_is(self):
+        """Небольшая картинка без метаданных не перекодируется."""
+        content = jpeg((80, 40))
+        post = self.create(content)
+        images.process(post.image.name)
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (80, 40))
+        with open(post.image.path, 'rb') as file:
+            self.assertEqual(file.read(), content)
+
+    def test_form_rejects_oversized_upload(self):
+        """Слишком тяжёлый файл или слишком много пикселей — ошибка формы."""
+        for limits in ({'POST_IMAGE_MAX_BYTES': 10},
+                       {'POST_IMAGE_MAX_PIXELS': 100}):
+            with self.subTest(limits=limits), override_settings(**limits):
+                response = self.client.post(reverse('posts:post_create'), {
+                    'text': 'Фото',
+                    'image': SimpleUploadedFile(
+                        'big.jpg', jpeg((20, 20)), 'image/jpeg'
+                    ),
+                })
+                self.assertIn('image', response.context['form'].errors)
+                self.assertFalse(Post.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.storage = images.storage()
+        # Файлы общие для тестов класса, а одинаковое содержимое — один файл.
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create(self, name='meme.gif'):
+        return Post.objects.create(
+            author=self.user, text='Мем',
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+        )
+
+    def test_identical_uploads_share_file(self):
+        """Одинаковые загрузки — один файл с именем из хэша."""
+        first = self.create('meme.gif')
+        second = self.create('copy.GIF')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(self.storage.is_content_name(first.image.name))
+        self.assertEqual(len(os.listdir(os.path.dirname(
+            first.image.path
+        ))), 1)
+
+    def test_release_deletes_unreferenced_only(self):
+        """Файл удаляется, только когда на него не ссылается ни один пост."""
+        first = self.create()
+        second = self.create()
+        name = first.image.name
+        thumbnails.generate(name)
+        first.delete()
+        self.assertFalse(images.release(name))
+        self.assertTrue(self.storage.exists(name))
+        second.delete()
+        # Свежий файл могла только что получить одинаковая загрузка.
+        self.assertFalse(images.release(name))
+        self.assertTrue(self.storage.exists(name))
+        old = time.time() - settings.POST_IMAGE_MIN_AGE - 1
+        os.utime(self.storage.path(name), (old, old))
+        self.assertTrue(images.release(name))
+        self.assertFalse(self.storage.exists(name))
+        self.assertEqual(thumbnails.manifests([name]), {})
+
+    def test_dedupe_media_command(self):
+        """Команда переносит старые файлы и склеивает повторы."""
+        os.makedirs(self.storage.path('posts'), exist_ok=True)
+        for name in ('posts/a.gif', 'posts/b.gif'):
+            with open(self.storage.path(name), 'wb') as file:
+                file.write(SMALL_GIF)
+            Post.objects.create(author=self.user, text='Мем', image=name)
+        out = StringIO()
+        call_command('dedupe_media', skip_thumbnails=True, stdout=out)
+        self.assertIn('Перенесено: 1, повторов: 1', out.getvalue())
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertTrue(self.storage.is_content_name(name))
+        self.assertTrue(self.storage.exists(name))
+        for old in ('posts/a.gif', 'posts/b.gif'):
+            self.assertFalse(self.storage.exists(old))
+
+    def test_clean_media_command(self):
+        """Команда удаляет старые файлы без ссылок и манифесты-сироты."""
+        post = self.create()
+        thumbnails.generate(post.image.name)
+        ThumbnailManifest.objects.create(image='posts/gone.gif', variants='{}')
+        kept = [post.image.name, *(
+            variant.name for variant in thumbnails.manifests(
+                [post.image.name]
+            )[post.image.name].values()
+        )]
+        orphans = ['posts/old.gif', 'cache/ab/cd/stale.jpg']
+        for name in orphans + ['posts/fresh.gif']:
+            os.makedirs(
+                os.path.dirname(self.storage.path(name)), exist_ok=True
+            )
+            with open(self.storage.path(name), 'wb') as file:
+                file.write(SMALL_GIF)
+        hour_ago = time.time() - 3600
+        for name in kept + orphans:
+            os.utime(self.storage.path(name), (hour_ago, hour_ago))
+        out = StringIO()
+        call_command('clean_media', dry_run=True, min_age=30, stdout=out)
+        self.assertIn('Можно удалить файлов: 2', out.getvalue())
+        self.assertTrue(self.storage.exists(orphans[0]))
+        call_command(
+            'clean_media', min_age=30, workers=2, batch_size=1,
+            stdout=StringIO(),
+        )
+        for name in orphans:
+            self.assertFalse(self.storage.exists(name))
+        for name in kept + ['posts/fresh.gif']:
+            self.assertTrue(self.storage.exists(name))
+        self.assertFalse(
+            ThumbnailManifest.objects.filter(image='posts/gone.gif').exists()
+        )
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.old = Post.objects.create(
+            author=self.user, text='Красивая книга про горы'
+        )
+        self.best = Post.objects.create(
+            author=self.user, text='Книги, книги и снова книга'
+        )
+        self.other = Post.objects.create(
+            author=self.user, text='Совсем о другом'
+        )
+        self.url = reverse('posts:search')
+
+    def found(self, query):
+        return list(search.search(query))
+
+    def test_word_forms_and_ranking(self):
+        """Поиск находит другие формы слова, частые совпадения выше."""
+        self.assertEqual(self.found('книгами'), [self.best, self.old])
+        self.assertEqual(self.found('красивые книги'), [self.old])
+        self.assertEqual(self.found(''), [])
+
+    def test_equal_rank_prefers_recent(self):
+        """При равной релевантности выше свежий пост."""
+        newer = Post.objects.create(author=self.user, text='Про горы')
+        self.assertEqual(self.found('гор'), [newer, self.old])
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при правке и удалении постов и комментариев."""
+        self.other.text = 'Теперь о горах'
+        self.other.save()
+        self.assertIn(self.other, self.found('горы'))
+        comment = Comment.objects.create(
+            post=self.best, author=self.user, text='Люблю горы'
+        )
+        self.assertIn(self.best, self.found('горы'))
+        comment.delete()
+        self.assertNotIn(self.best, self.found('горы'))
+        self.old.delete()
+        self.assertEqual(self.found('красивая'), [])
+
+    def test_rebuild_search_index(self):
+        """Команда заново строит тот же индекс."""
+        before = self.found('книга')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.found('книга'), before)
+
+    def test_search_page(self):
+        """Страница поиска показывает найденные посты."""
+        response = self.client.get(self.url, {'q': 'книжка книга'})
+        self.assertEqual(response.context['query'], 'книжка книга')
+        self.assertEqual(list(response.context['page_obj']), [])
+        response = self.client.get(self.url, {'q': 'Книги'})
+        self.assertEqual(
+            list(response.context['page_obj']), [self.best, self.old]
+        )
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт по индексу."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'книгами'}
+        )
+        self.assertEqual(
+            set(response.context['cl'].queryset), {self.best, self.old}
+        )
+
+
+class LoadDataTest(TestCase):
+    def test_generate_and_benchmark(self):
+        """Генератор заполняет базу, замер проходит по всем адресам."""
+        call_command(
+            'generate_load_data', users=20, groups=3, posts=60, comments=40,
+            follows=5, seed=1, stdout=StringIO(),
+        )
+        self.assertEqual(Post.objects.filter(
+            author__username__startswith='load_'
+        ).count(), 60)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        reader = User.objects.filter(follower__isnull=False).first()
+        self.assertEqual(
+            reader.stats.following_count, reader.follower.count()
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command(
+                'benchmark_views', requests=2, warmup=0, output=output,
+                stdout=StringIO(),
+            )
+            with open(output, encoding='utf-8') as file:
+                run = json.load(file)
+        self.assertEqual(run['dataset']['posts'], 60)
+        self.assertIn('posts:index', run['urls'])
+        self.assertIn('posts:follow_index', run['urls'])
+        index = run['urls']['posts:index']
+        self.assertEqual(index['status'], [200])
+        self.assertIn('p99', index['latency_ms'])
+        out = StringIO()
+        call_command(
+            'benchmark_templates', renders=2, cold_runs=2, stdout=out
+        )
+        self.assertIn('cached_flat', out.getvalue())
+
+
+class PostCardCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.posts = [
+            Post.objects.create(
+                author=self.author, text=f'Пост {number}', group=self.group
+            )
+            for number in range(3)
+        ]
+        self.url = reverse('posts:index')
+
+    def test_cards_come_from_cache(self):
+        """Повторный рендер страницы берёт карточки одним get_many."""
+        self.client.get(self.url)
+        page_cache.bump(page_cache.INDEX_SCOPE)
+        with mock.patch(
+            'posts.cards.render_to_string'
+        ) as render, mock.patch(
+            'posts.cards.cache.get_many', wraps=cache.get_many
+        ) as get_many:
+            response = self.client.get(self.url)
+        render.assert_not_called()
+        card_lookups = [
+            keys for (keys,), _ in get_many.call_args_list
+            if keys[0].startswith('post_card:')
+        ]
+        self.assertEqual(len(card_lookups), 1)
+        self.assertEqual(len(card_lookups[0]), 3)
+        self.assertContains(response, 'Пост 2')
+
+    def test_card_changes_with_post_author_and_group(self):
+        """Правка поста, имени автора или группы даёт новую карточку."""
+        post = self.posts[0]
+        keys = {cards.card_key(post)}
+        post.text = 'Новый текст'
+        keys.add(cards.card_key(post))
+        post.group = None
+        keys.add(cards.card_key(post))
+        post.author.first_name = 'Алексей'
+        keys.add(cards.card_key(post))
+        self.assertEqual(len(keys), 4)
+
+    def test_author_rename_reaches_listings(self):
+        """Новое имя автора сразу видно в закэшированных лентах."""
+        self.client.get(self.url)
+        self.author.first_name = 'Алексей'
+        self.author.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Алексей Толстой')
+        self.assertNotContains(response, 'Лев Толстой')
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+        self.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+
+    def revalidate(self, url, response, client=None):
+        return (client or self.client).get(
+            url,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+
+    def test_unchanged_listing_not_modified(self):
+        """Неизменная лента отвечает 304 без запросов к базе."""
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertIn('no-cache', response['Cache-Control'])
+        with self.assertNumQueries(0):
+            revalidated = self.revalidate(url, response)
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated['ETag'], response['ETag'])
+
+    def test_new_post_changes_listing(self):
+        """Новый пост в ленте даёт полный ответ."""
+        url = reverse(
+            'posts:profile', kwargs={'username': self.author.username}
+        )
+        response = self.client.get(url)
+        Post.objects.create(author=self.author, text='Ещё пост')
+        revalidated = self.revalidate(url, response)
+        self.assertEqual(revalidated.status_code, 200)
+        self.assertNotEqual(revalidated['ETag'], response['ETag'])
+
+    def test_unchanged_post_not_modified(self):
+        """Неизменный пост проверяется одним запросом к базе."""
+        response = self.client.get(self.detail_url)
+        with self.assertNumQueries(1):
+            revalidated = self.revalidate(self.detail_url, response)
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_comment_and_edit_change_post(self):
+        """Комментарий и правка текста меняют валидаторы поста."""
+        response = self.client.get(self.detail_url)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        response = self.revalidate(self.detail_url, response)
+        self.assertContains(response, 'Комментарий')
+        self.post.text = 'Исправленный пост'
+        # Last-Modified точен до секунды: правка приходит позже.
+        later = int((time.time() + 5) * 1000)
+        with mock.patch('posts.page_cache._now', return_value=later):
+            self.post.save()
+        revalidated = self.client.get(
+            self.detail_url,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertContains(revalidated, 'Исправленный пост')
+
+    def test_validators_differ_per_user(self):
+        """Гость и пользователь получают разные ETag."""
+        client = Client()
+        client.force_login(self.reader)
+        guest = self.client.get(self.detail_url)
+        user = client.get(self.detail_url)
+        self.assertNotEqual(guest['ETag'], user['ETag'])
+        self.assertIn('private', user['Cache-Control'])
+        self.assertEqual(
+            self.revalidate(self.detail_url, guest, client).status_code, 200
+        )
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.posts = [
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+            for number in range(5)
+        ]
+        Comment.objects.create(
+            post=self.posts[0], author=self.author, text='Комментарий'
+        )
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def read_jsonl(self, name):
+        path = os.path.join(self.directory, name)
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def test_incremental_export(self):
+        """Выгрузка идёт пачками и продолжается с сохранённого id."""
+        state = os.path.join(self.directory, 'state.json')
+        options = dict(
+            output_dir=self.directory, gzip=True, state=state, batch_size=2,
+            stdout=StringIO(),
+        )
+        call_command('export_content', 'posts', 'comments', **options)
+        posts = self.read_jsonl('posts.jsonl.gz')
+        self.assertEqual(
+            [post['id'] for post in posts],
+            [post.pk for post in self.posts],
+        )
+        self.assertEqual(posts[0]['author__username'], 'author')
+        self.assertEqual(len(self.read_jsonl('comments.jsonl.gz')), 1)
+        new = Post.objects.create(author=self.author, text='Новый пост')
+        call_command('export_content', 'posts', **options)
+        self.assertEqual(
+            [post['id'] for post in self.read_jsonl('posts.jsonl.gz')],
+            [new.pk],
+        )
+
+    def test_since_with_all_sources(self):
+        """--since без списка не обрывает выгрузку на подписках."""
+        state = os.path.join(self.directory, 'state.json')
+        follower = User.objects.create_user(username='follower')
+        follow = Follow.objects.create(user=follower, author=self.author)
+        call_command(
+            'export_content', output_dir=self.directory, gzip=True,
+            state=state, since=timezone.now() + timedelta(days=1),
+            stdout=StringIO(),
+        )
+        self.assertEqual(self.read_jsonl('posts.jsonl.gz'), [])
+        self.assertEqual(
+            [row['id'] for row in self.read_jsonl('follows.jsonl.gz')],
+            [follow.pk],
+        )
+        with open(state, encoding='utf-8') as file:
+            self.assertEqual(json.load(file)['follows'], follow.pk)
+
+    def test_since_with_undated_source(self):
+        """Явный недатированный источник с --since — ошибка до записи."""
+        with self.assertRaises(CommandError):
+            call_command(
+                'export_content', 'posts', 'follows',
+                output_dir=self.directory, since=timezone.now(),
+                stdout=StringIO(),
+            )
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_csv_export(self):
+        """CSV начинается с заголовка, группы тоже выгружаются."""
+        Group.objects.create(title='Группа', slug='group')
+        call_command(
+            'export_content', 'groups', format='csv',
+            output_dir=self.directory, stdout=StringIO(),
+        )
+        with open(os.path.join(self.directory, 'groups.csv')) as file:
+            lines = file.read().splitlines()
+        self.assertEqual(lines[0], 'id,slug,title,description,posts_count')
+        self.assertEqual(len(lines), 2)
+
+    def test_admin_action_streams_selected_posts(self):
+        """Действие в админке отдаёт выбранные посты потоком."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        selected = [self.posts[1].pk, self.posts[3].pk]
+        response = self.client.post(
+            reverse('admin:posts_post_changelist'),
+            {'action': 'export_jsonl', '_selected_action': selected},
+        )
+        self.assertTrue(response.streaming)
+        rows = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual([row['id'] for row in rows], selected)
+
+
+class ImportTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, lines):
+        path = os.path.join(self.directory, name)
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
+        return path
+
+    def test_import(self):
+        """Импорт сохраняет даты и пересчитывает всё производное."""
+        groups = self.write('groups.csv', [
+            'id,slug,title,description',
+            '7,legacy,Старая группа,',
+        ])
+        posts = self.write('posts.jsonl.gz', [
+            json.dumps({
+                'id': 100 + number, 'author__username': 'author',
+                'group': 'legacy', 'text': f'Старый пост {number}',
+                'pub_date': f'2015-01-0{number + 1}T10:00:00+00:00',
+            })
+            for number in range(3)
+        ] + [json.dumps({'author': 'nobody', 'text': 'Без автора'})])
+        comments = self.write('comments.csv', [
+            'post_id,author,text,created',
+            '100,reader,Старый комментарий,2015-02-01T10:00:00+00:00',
+            '999,reader,К несуществующему посту,',
+        ])
+        follows = self.write('follows.csv', ['user,author', 'reader,author'])
+        out, err = StringIO(), StringIO()
+        call_command(
+            'import_content', groups=groups, posts=posts, comments=comments,
+            follows=follows, batch_size=2, stdout=out, stderr=err,
+        )
+        self.assertIn('строк/с', out.getvalue())
+        self.assertIn('nobody', err.getvalue())
+        post = Post.objects.get(pk=100)
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(post.group.slug, 'legacy')
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.group.posts_count, 3)
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 3)
+        self.assertEqual(self.author.stats.followers_count, 1)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 3
+        )
+        self.assertCountEqual(
+            search.search('старый').values_list('pk', flat=True),
+            [100, 101, 102],
+        )
+        new = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertGreater(new.pk, 102)
+
+    def test_failed_batch_keeps_loaded_rows_consistent(self):
+        """После сбоя пачки записанные строки пересчитаны и в индексе."""
+        taken = Post.objects.create(author=self.author, text='Занятый id')
+        posts = self.write('posts.jsonl', [
+            json.dumps({
+                'id': 500, 'author': 'author', 'text': 'Записанный архив',
+            }),
+            json.dumps({'id': taken.pk, 'author': 'author', 'text': 'Дубль'}),
+        ])
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command(
+                'import_content', posts=posts, batch_size=1,
+                stdout=StringIO(), stderr=StringIO(),
+            )
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 2)
+        self.assertEqual(
+            list(search.search('архив').values_list('pk', flat=True)), [500]
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post_id=500)
+        )
+
+    def test_round_trip(self):
+        """Своя выгрузка загружается обратно в пустую базу."""
+        group = Group.objects.create(title='Группа', slug='group')
+        post = Post.objects.create(
+            author=self.author, group=group, text='Пост для выгрузки'
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Ответ')
+        Follow.objects.create(user=self.reader, author=self.author)
+        kinds = ('groups', 'posts', 'comments', 'follows')
+        call_command(
+            'export_content', *kinds, output_dir=self.directory,
+            stdout=StringIO(),
+        )
+        for model in (Follow, Comment, Post, Group):
+            model.objects.all().delete()
+        err = StringIO()
+        call_command(
+            'import_content', stdout=StringIO(), stderr=err, **{
+                kind: os.path.join(self.directory, f'{kind}.jsonl')
+                for kind in kinds
+            }
+        )
+        self.assertEqual(err.getvalue(), '')
+        self.assertEqual(Post.objects.get(pk=post.pk).group, group)
+        self.assertEqual(Comment.objects.get().author, self.reader)
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author
+        ).exists())
+
+    def test_follows_by_id(self):
+        """Подписки из старой выгрузки узнаются по id пользователей."""
+        follows = self.write('follows.csv', [
+            'id,user_id,author_id', f'1,{self.reader.pk},{self.author.pk}',
+        ])
+        err = StringIO()
+        call_command(
+            'import_content', follows=follows, stdout=StringIO(), stderr=err,
+        )
+        self.assertEqual(err.getvalue(), '')
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author
+        ).exists())
@@ -0,0 +1,167 @@
+import json
+import logging
+import multiprocessing
+from concurrent.futures import (
+    BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor,
+)
+
+import django
+from django.conf import settings
+from django.db import connections, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+
+from . import images, page_cache
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+backend = ThumbnailBackend()
+
+
+def generate(name):
+    """Строит миниатюры всех размеров из POST_THUMBNAILS и их манифест."""
+    built = {}
+    for geometry, options in settings.POST_THUMBNAILS.items():
+        try:
+            thumbnail = backend.get_thumbnail(name, geometry, **options)
+        except Exception:
+            logger.exception('Не удалось построить миниатюру %s', name)
+            continue
+        if thumbnail.size is None:
+            # sorl не смог прочитать оригинал и вернул пустую миниатюру.
+            continue
+        built[geometry] = [thumbnail.name, thumbnail.width, thumbnail.height]
+    if built:
+        save_manifest(name, built)
+    return name
+
+
+def save_manifest(name, built):
+    # Модуль импортируют процессы пула ещё до django.setup().
+    from .models import ThumbnailManifest
+
+    ThumbnailManifest.objects.update_or_create(
+        image=name, defaults={'variants': json.dumps(built)}
+    )
+
+
+class Variant:
+    """Готовая миниатюра из манифеста: как у sorl, url и размеры."""
+
+    def __init__(self, name, width, height):
+        self.name = name
+        self.width = width
+        self.height = height
+
+    @property
+    def url(self):
+        return default.storage.url(self.name)
+
+
+def manifests(names):
+    """Миниатюры картинок одним запросом: имя -> {размер: Variant}.
+
+    Картинок без построенных миниатюр в ответе нет.
+    """
+    from .models import ThumbnailManifest
+
+    names = {name for name in names if name}
+    if not names:
+        return {}
+    rows = ThumbnailManifest.objects.filter(image__in=names).values_list(
+        'image', 'variants'
+    )
+    return {
+        image: {
+            geometry: Variant(*variant)
+            for geometry, variant in json.loads(variants).items()
+        }
+        for image, variants in rows
+    }
+
+
+def prepare(name):
+    """Новая картинка: оригинал через images.process, затем миниатюры."""
+    try:
+        name = images.process(name)
+    except Exception:
+        logger.exception('Не удалось обработать картинку %s', name)
+    return generate(name)
+
+
+def refresh_pages(name):
+    """Сбрасывает кэш страниц, где вместо миниатюры была заглушка."""
+    # Модуль импортируют процессы пула ещё до django.setup().
+    from .models import Post
+
+    posts = Post.objects.filter(image=name).select_related('author', 'group')
+    for post in posts:
+        page_cache.bump(*page_cache.post_scopes(post))
+
+
+def _generated(future):
+    if future.exception() is None:
+        refresh_pages(future.result())
+
+
+def _submit(name):
+    global _executor
+    try:
+        future = get_executor().submit(prepare, name)
+    except BrokenExecutor:
+        # Упавший пул пересоздаётся при следующей загрузке; эту картинку
+        # достроит команда generate_thumbnails.
+        logger.exception('Очередь миниатюр недоступна')
+        _executor = None
+        return
+    future.add_done_callback(_generated)
+
+
+def _prepare_now(name):
+    refresh_pages(prepare(name))
+
+
+def init_worker(databases):
+    # Процесс пула читает настройки заново: базы берутся те же, что
+    # у родителя, даже если их имена подменили уже после загрузки.
+    for alias, name in databases.items():
+        settings.DATABASES[alias]['NAME'] = name
+    django.setup()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        workers = settings.THUMBNAIL_WORKERS
+        if settings.THUMBNAIL_QUEUE == 'process':
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker,
+                initargs=({
+                    alias: connections[alias].settings_dict['NAME']
+                    for alias in connections
+                },),
+            )
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix='thumbnails'
+            )
+    return _executor
+
+
+def enqueue(name):
+    """Ставит обработку картинки в очередь после фиксации транзакции.
+
+    THUMBNAIL_QUEUE: 'process' — пул процессов, 'thread' — локальная
+    очередь в потоках этого процесса, 'sync' — сразу в запросе.
+    """
+    if not name:
+        return
+    if settings.THUMBNAIL_QUEUE == 'sync':
+        transaction.on_commit(lambda: _prepare_now(name))
+    else:
+        transaction.on_commit(lambda: _submit(name))
@@ -0,0 +1,204 @@
+import heapq
+
+from django.conf import settings
+from django.db.models import OuterRef, Q, Subquery
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .paginator import CursorPaginator, cursor_key
+
+# Записей ленты в одном INSERT и подписчиков, чьи ленты дополняются
+# за один проход: в памяти не больше FILL_READERS * TIMELINE_LENGTH.
+FILL_BATCH = 500
+FILL_READERS = 50
+
+
+def is_celebrity(author):
+    """Автора с огромной аудиторией не раскладываем по лентам."""
+    return UserStats.objects.filter(
+        user=author,
+        followers_count__gte=settings.TIMELINE_CELEBRITY_FOLLOWERS,
+    ).exists()
+
+
+def trim(user_ids):
+    """Оставляет в лентах пользователей только последние записи."""
+    cutoff = TimelineEntry.objects.filter(
+        user=OuterRef('user')
+    ).order_by('-pub_date', '-post').values('pub_date')[
+        settings.TIMELINE_LENGTH - 1:settings.TIMELINE_LENGTH
+    ]
+    TimelineEntry.objects.filter(
+        user__in=user_ids,
+        pub_date__lt=Subquery(cutoff),
+    ).delete()
+
+
+def fan_out(post):
+    """Кладёт новый пост в ленты всех подписчиков автора."""
+    if is_celebrity(post.author):
+        return
+    followers = list(
+        Follow.objects.filter(author=post.author).values_list(
+            'user', flat=True
+        )
+    )
+    if not followers:
+        return
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers
+        ],
+        ignore_conflicts=True,
+    )
+    trim(followers)
+
+
+def backfill(user, author):
+    """Добавляет в ленту подписчика последние посты нового автора."""
+    if is_celebrity(author):
+        return
+    _fill([user.pk], author)
+
+
+def _fill(user_ids, author):
+    posts = list(Post.objects.filter(author=author).values_list(
+        'pk', 'pub_date'
+    )[:settings.TIMELINE_LENGTH])
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for user_id in user_ids
+            for pk, pub_date in posts
+        ),
+        batch_size=FILL_BATCH,
+        ignore_conflicts=True,
+    )
+    trim(user_ids)
+
+
+def followers_changed(author, delta):
+    """Следит за переходом автора через TIMELINE_CELEBRITY_FOLLOWERS.
+
+    Ставший знаменитостью читается напрямую, и его записи из лент
+    убираются. Переставшему раскладываются его последние посты: те,
+    что вышли за время славы, в ленты не попадали.
+    """
+    count = UserStats.objects.filter(user=author).values_list(
+        'followers_count', flat=True
+    ).first()
+    threshold = settings.TIMELINE_CELEBRITY_FOLLOWERS
+    if delta > 0 and count == threshold:
+        TimelineEntry.objects.filter(post__author=author).delete()
+    elif delta < 0 and count == threshold - 1:
+        followers = list(Follow.objects.filter(author=author).values_list(
+            'user', flat=True
+        ))
+        for start in range(0, len(followers), FILL_READERS):
+            _fill(followers[start:start + FILL_READERS], author)
+
+
+def prune(user, author):
+    """Убирает из ленты посты автора, от которого отписались."""
+    TimelineEntry.objects.filter(user=user, post__author=author).delete()
+
+
+def rebuild(user_id):
+    """Собирает ленту заново из последних постов всех авторов подписки."""
+    TimelineEntry.objects.filter(user=user_id).delete()
+    authors = Follow.objects.filter(user=user_id).exclude(
+        author__stats__followers_count__gte=(
+            settings.TIMELINE_CELEBRITY_FOLLOWERS
+        ),
+    ).values('author')
+    posts = Post.objects.filter(author__in=authors).order_by(
+        '-pub_date', '-pk'
+    ).values_list('pk', 'pub_date')[:settings.TIMELINE_LENGTH]
+    TimelineEntry.objects.bulk_create([
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts
+    ])
+
+
+def celebrities(user):
+    """Авторы подписки, чьи посты в ленту не раскладываются."""
+    return list(Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gte=(
+            settings.TIMELINE_CELEBRITY_FOLLOWERS
+        ),
+    ).values_list('author', flat=True))
+
+
+def timeline_posts(user):
+    """Посты ленты подписок: готовая лента плюс посты знаменитостей."""
+    authors = celebrities(user)
+    if not authors:
+        return Post.objects.filter(timeline_entries__user=user)
+    entries = TimelineEntry.objects.filter(user=user).values('post')
+    return Post.objects.filter(Q(pk__in=entries) | Q(author__in=authors))
+
+
+def page_keys(user, authors, limit, key=None, backward=False):
+    """Ключи (pub_date, id) постов ленты после `key`, не больше `limit`.
+
+    Записи ленты читаются по индексу (user, pub_date, post), посты
+    знаменитостей `authors` — по индексу (author, pub_date, id). Из
+    каждого источника берётся не больше `limit` ключей, слияние — здесь.
+    """
+    sources = [(TimelineEntry.objects.filter(user=user), 'post_id')]
+    if authors:
+        sources.append((Post.objects.filter(author__in=authors), 'pk'))
+    lookup = 'gt' if backward else 'lt'
+    keys = []
+    for queryset, field in sources:
+        if key is not None:
+            queryset = queryset.filter(
+                Q(**{f'pub_date__{lookup}': key[0]})
+                | Q(**{'pub_date': key[0], f'{field}__{lookup}': key[1]})
+            )
+        ordering = ('pub_date', field) if backward else (
+            '-pub_date', f'-{field}'
+        )
+        keys.append(list(
+            queryset.order_by(*ordering).values_list('pub_date', field)[
+                :limit
+            ]
+        ))
+    # Пост знаменитости мог попасть в ленту до того, как она ею стала.
+    merged = dict.fromkeys(heapq.merge(*keys, reverse=not backward))
+    return list(merged)[:limit]
+
+
+class TimelinePaginator(CursorPaginator):
+    """Лента подписок страницами по записям ленты, а не по постам.
+
+    Ключи страницы даёт page_keys, а строки `object_list` (посты или
+    их values()) читаются одним запросом по id.
+    """
+
+    def __init__(self, object_list, per_page, user, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.user = user
+        self.celebrities = celebrities(user)
+
+    def _offset_rows(self, bottom):
+        keys = page_keys(
+            self.user, self.celebrities, bottom + self.per_page + 1
+        )
+        return self.rows_for(keys[bottom:])
+
+    def _rows(self, key=None, backward=False):
+        return self.rows_for(page_keys(
+            self.user, self.celebrities, self.per_page + 1, key, backward
+        ))
+
+    def rows_for(self, keys):
+        """Строки `object_list` в порядке ключей."""
+        if not keys:
+            return []
+        rows = {
+            cursor_key(row)[1]: row
+            for row in self.object_list.filter(pk__in=[pk for _, pk in keys])
+        }
+        return [rows[pk] for _, pk in keys if pk in rows]
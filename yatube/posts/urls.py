@@ -15,6 +15,7 @@ urlpatterns = [
         'posts/<int:post_id>/comment/', views.add_comment, name='add_comment'
     ),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
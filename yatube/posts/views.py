@@ -1,25 +1,48 @@
+from functools import partial
+
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 
+from core.db import retry_on_locked
+from core.parallel import gather
+from core.replicas import use_replica
+
+from . import feeds
+from . import search as search_index
+from .conditional import conditional, listing_state, post_state
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post
+from .page_cache import GROUP_SCOPE, INDEX_SCOPE, PROFILE_SCOPE, cache_listing
+from .paginator import CursorPaginator
+from .timeline import TimelinePaginator
 
 COUNT_POSTS = 10
 User = get_user_model()
 
 
 def paginator(queryset, request):
-    paginator = Paginator(queryset, COUNT_POSTS)
+    return get_page(listing(queryset), request)
+
+
+def listing(queryset):
+    return CursorPaginator(queryset, COUNT_POSTS, approximate_count=True)
+
+
+def get_page(paginator, request):
     page_number = request.GET.get('page')
+    cursor = request.GET.get('cursor')
+    if cursor or not page_number:
+        return paginator.get_cursor_page(cursor)
     return paginator.get_page(page_number)
 
 
-@cache_page(20, key_prefix='index_page')
+@use_replica
+@conditional(listing_state(INDEX_SCOPE))
+@cache_listing(INDEX_SCOPE)
 def index(request):
-    posts = Post.objects.select_related('group', 'author')
+    posts = feeds.index_posts()
     page_obj = paginator(posts, request)
     context = {
         'page_obj': page_obj,
@@ -27,10 +50,17 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@use_replica
+@conditional(listing_state(GROUP_SCOPE))
+@cache_listing(GROUP_SCOPE)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author')
-    page_obj = paginator(posts, request)
+    group_id = Group.objects.filter(slug=slug).values('pk')[:1]
+    pages = listing(feeds.group_posts(group_id))
+    group, page_obj, _ = gather(
+        partial(get_object_or_404, Group, slug=slug),
+        partial(get_page, pages, request),
+        lambda: pages.count,
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -38,14 +68,27 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@use_replica
+@conditional(listing_state(PROFILE_SCOPE))
+@cache_listing(PROFILE_SCOPE)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    page_obj = paginator(posts, request)
-    is_following = Follow.objects.filter(
-        user=request.user.id,
-        author=author,
-    ).exists()
+    # Автор нужен остальным запросам только как id: подзапрос по
+    # username позволяет выполнить их одновременно с поиском автора.
+    author_id = User.objects.filter(username=username).values('pk')[:1]
+    pages = listing(feeds.profile_posts(author_id))
+    author, page_obj, _, is_following = gather(
+        partial(
+            get_object_or_404,
+            User.objects.select_related('stats'),
+            username=username,
+        ),
+        partial(get_page, pages, request),
+        lambda: pages.count,
+        Follow.objects.filter(
+            user=request.user.id,
+            author=author_id,
+        ).exists,
+    )
     context = {
         'author': author,
         'page_obj': page_obj,
@@ -54,10 +97,26 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+@use_replica
+def search(request):
+    query = request.GET.get('q', '').strip()
+    posts = search_index.search(query, feeds.index_posts())
+    page_obj = Paginator(posts, COUNT_POSTS).get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@use_replica
+@conditional(post_state)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post, comments = gather(
+        partial(get_object_or_404, feeds.detail_posts(), id=post_id),
+        partial(list, feeds.post_comments(post_id)),
+    )
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
     context = {
         'post': post,
         'form': form,
@@ -67,8 +126,9 @@ def post_detail(request, post_id):
 
 
 @login_required
+@retry_on_locked
 def post_create(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
@@ -78,6 +138,7 @@ def post_create(request):
 
 
 @login_required
+@retry_on_locked
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = PostForm(request.POST or None,
@@ -96,6 +157,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@retry_on_locked
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -107,10 +169,14 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@use_replica
 @login_required
 def follow_index(request):
-    follow_objects = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator(follow_objects, request)
+    pages = TimelinePaginator(
+        feeds.follow_posts(request.user), COUNT_POSTS, request.user,
+        approximate_count=True,
+    )
+    page_obj = get_page(pages, request)
     context = {
         'page_obj': page_obj,
     }
@@ -118,6 +184,7 @@ def follow_index(request):
 
 
 @login_required
+@retry_on_locked
 def profile_follow(request, username):
     user = request.user
     author = get_object_or_404(User, username=username)
@@ -127,6 +194,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@retry_on_locked
 def profile_unfollow(request, username):
     Follow.objects.filter(
         user=request.user,
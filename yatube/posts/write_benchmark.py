@@ -0,0 +1,75 @@
+"""Писатели для benchmark_writes: работают в отдельных процессах.
+
+Модуль импортируется в процессе до django.setup(), поэтому модели
+и клиент импортируются внутри функций.
+"""
+import time
+
+import django
+from django.conf import settings
+
+PREFIX = 'bench_writer_'
+# Так sqlite3 работает в Django без core.backends.sqlite3.
+BASELINE_PRAGMAS = {
+    # Иначе core.backends.sqlite3 вернёт базе WAL первым же соединением.
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'cache_size': -2000,
+    'mmap_size': 0,
+    'temp_store': 'DEFAULT',
+}
+
+
+def init_writer(baseline):
+    django.setup()
+    from django.db import connection
+
+    if baseline:
+        connection.settings_dict['PRAGMAS'] = BASELINE_PRAGMAS
+        connection.settings_dict['BEGIN_IMMEDIATE'] = False
+        settings.WRITE_RETRY_ATTEMPTS = 1
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            mode = cursor.fetchone()[0]
+        if mode != 'delete':
+            raise RuntimeError(f'Базовый прогон в режиме журнала {mode}.')
+
+
+def write(username, author, post_id, writes):
+    """Пишет через представления: комментарий, пост, подписка/отписка."""
+    from django.contrib.auth import get_user_model
+    from django.db import Error
+    from django.urls import reverse
+
+    from core.testing import local_client
+
+    User = get_user_model()
+    client = local_client(User.objects.get(username=username))
+    requests = [
+        lambda: client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post_id}),
+            {'text': 'Комментарий'},
+        ),
+        lambda: client.post(reverse('posts:post_create'), {'text': 'Пост'}),
+        lambda: client.get(
+            reverse('posts:profile_follow', kwargs={'username': author})
+        ),
+        lambda: client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': author})
+        ),
+    ]
+    timings = []
+    errors = 0
+    started = time.time()
+    for number in range(writes):
+        request_started = time.perf_counter()
+        try:
+            response = requests[number % len(requests)]()
+        except Error:
+            errors += 1
+            continue
+        if response.status_code >= 400:
+            errors += 1
+            continue
+        timings.append((time.perf_counter() - request_started) * 1000)
+    return started, time.time(), timings, errors
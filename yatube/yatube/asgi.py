@@ -0,0 +1,20 @@
+import os
+
+from asgiref.wsgi import WsgiToAsgi
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from core.fileserver import FileServer
+from core.template_loaders import warm_up
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+# В Django 2.2 нет своего ASGI-обработчика: каждый запрос выполняется
+# WSGI-приложением в потоке, а сервер обслуживает соединения в asyncio.
+application = get_wsgi_application()
+if settings.SERVE_FILES:
+    application = FileServer(application)
+application = WsgiToAsgi(application)
+
+if settings.TEMPLATE_WARM_UP:
+    warm_up()
@@ -0,0 +1,22 @@
+"""Настройки выбираются переменной окружения DJANGO_ENV.
+
+dev (по умолчанию) — локальная разработка с debug_toolbar, prod — боевой
+сервер, bench — боевые настройки на локальной базе для замеров. Профиль
+можно указать и напрямую: DJANGO_SETTINGS_MODULE=yatube.settings.prod.
+"""
+import os
+
+PROFILES = ('dev', 'prod', 'bench')
+
+PROFILE = os.getenv('DJANGO_ENV', 'dev')
+if PROFILE == 'prod':
+    from .prod import *  # noqa: F401,F403
+elif PROFILE == 'bench':
+    from .bench import *  # noqa: F401,F403
+elif PROFILE == 'dev':
+    from .dev import *  # noqa: F401,F403
+else:
+    raise ImportError(
+        f'Неизвестный профиль DJANGO_ENV={PROFILE!r}, '
+        f'ожидается один из {PROFILES}'
+    )
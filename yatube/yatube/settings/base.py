@@ -0,0 +1,203 @@
+import os
+
+BASE_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+STATIC_ROOT = os.getenv('STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles'))
+
+LOGIN_URL = 'users:login'
+LOGIN_REDIRECT_URL = 'posts:index'
+# LOGOUT_REDIRECT_URL = 'posts:index'
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+
+
+SECRET_KEY = os.getenv('SECRET_KEY', default='SECRET_KEY')
+
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    host for host in os.getenv('ALLOWED_HOSTS', '').split(',') if host
+] + [
+    'localhost',
+    '127.0.0.1',
+    '[::1]',
+    'testserver',
+    'www.HoneyKnight.pythonanywhere.com',
+    'HoneyKnight.pythonanywhere.com',
+]
+
+
+INSTALLED_APPS = [
+    'django.contrib.staticfiles',
+    'posts.apps.PostsConfig',
+    'users.apps.UsersConfig',
+    'about.apps.AboutConfig',
+    'core.apps.CoreConfig',
+    'api.apps.ApiConfig',
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'sorl.thumbnail',
+]
+
+
+MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.replicas.ReplicaMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [TEMPLATES_DIR],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year',
+            ],
+        },
+    },
+]
+
+
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+TEMPLATE_WARM_UP = False
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+
+
+DATABASES = {
+    'default': {
+        # sqlite3 с WAL, прагмами и BEGIN IMMEDIATE: core/backends.
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': os.getenv(
+            'DATABASE_PATH', os.path.join(BASE_DIR, 'db.sqlite3')
+        ),
+    }
+}
+
+# Реплики для чтения: пути к копиям базы через запятую. Их наполняет
+# репликация; в тестах они смотрят в default.
+for number, path in enumerate(
+    filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), start=1
+):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'], 'NAME': path, 'TEST': {'MIRROR': 'default'},
+    }
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+# Сколько секунд после записи читать свои данные из default.
+REPLICA_PIN_SECONDS = 10
+# Потоки для независимых запросов одной страницы (core.parallel);
+# 0 — по очереди. Окупается, когда запросы ждут сеть или диск: у SQLite
+# с прогретым кэшем передача в поток дороже самих запросов.
+QUERY_WORKERS = int(os.getenv('QUERY_WORKERS', 0))
+
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+STATIC_URL = '/static/'
+MEDIA_URL = '/media/'
+# Статику из STATIC_ROOT и медиа отдаёт core.fileserver, обёртка
+# WSGI-приложения; 0 — если их отдаёт веб-сервер перед Django.
+SERVE_FILES = bool(int(os.getenv('SERVE_FILES', 1)))
+# Сколько секунд кэшировать файлы без хэша в имени.
+FILES_MAX_AGE = int(os.getenv('FILES_MAX_AGE', 60 * 60))
+CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+PAGE_CACHE_TIMEOUT = 60 * 60 * 6
+
+PERFORMANCE_SAMPLE_RATE = float(os.getenv('PERFORMANCE_SAMPLE_RATE', 1))
+
+TIMELINE_LENGTH = 1000
+TIMELINE_CELEBRITY_FOLLOWERS = 10000
+
+# Миниатюры картинок постов: размер -> параметры sorl-thumbnail. Все
+# с пропорциями карточки 960x339 и идут в srcset.
+POST_THUMBNAILS = {
+    geometry: {'crop': 'center', 'upscale': True}
+    for geometry in ('480x170', '720x254', '960x339', '1440x508')
+}
+# 'process' — пул процессов, 'thread' — потоки, 'sync' — в самом запросе.
+# Пул процессов включён только в prod: при разработке и в тестах
+# миниатюры строятся в запросе.
+THUMBNAIL_QUEUE = os.getenv('THUMBNAIL_QUEUE', 'sync')
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', 2))
+
+# Загрузки пишутся во временный файл, а не читаются в память целиком.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+# Картинки постов (posts/images.py): пределы загрузки и обработка.
+POST_IMAGE_MAX_BYTES = 25 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 50_000_000
+POST_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+POST_IMAGE_MAX_SIDE = 2560
+POST_IMAGE_QUALITY = 85
+# Дополнительные копии рядом с оригиналом: 'webp', 'avif'.
+POST_IMAGE_VARIANTS = tuple(filter(
+    None, os.getenv('POST_IMAGE_VARIANTS', 'webp').split(',')
+))
+
+# Файлы картинок моложе стольких секунд не удаляются ни release, ни
+# clean_media: одинаковая загрузка могла сослаться на файл, а пост с ним
+# ещё не сохранён.
+POST_IMAGE_MIN_AGE = 60 * 60
+
+POST_CARD_TIMEOUT = 60 * 60 * 24
+
+# Сколько раз запускать пишущее представление, если база занята.
+WRITE_RETRY_ATTEMPTS = 3
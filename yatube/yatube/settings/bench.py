@@ -0,0 +1,21 @@
+import os
+
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from .prod import *  # noqa: E402,F401,F403
+from .prod import BASE_DIR, DATABASES  # noqa: E402
+
+PROFILE = 'bench'
+
+# Отдельная база, чтобы сгенерированные данные не смешивались с рабочими.
+DATABASES = {
+    **DATABASES,
+    'default': {
+        **DATABASES['default'],
+        'NAME': os.getenv(
+            'DATABASE_PATH', os.path.join(BASE_DIR, 'bench.sqlite3')
+        ),
+    },
+}
+
+PERFORMANCE_SAMPLE_RATE = float(os.getenv('PERFORMANCE_SAMPLE_RATE', 1))
@@ -0,0 +1,68 @@
+import os
+
+from .base import *  # noqa: F401,F403
+from .base import BASE_DIR, DATABASES, MIDDLEWARE, TEMPLATE_LOADERS, TEMPLATES
+
+PROFILE = 'prod'
+
+DEBUG = False
+
+# Без ключа из окружения профиль не загружается.
+SECRET_KEY = os.environ['SECRET_KEY']
+
+# Миниатюры строит пул процессов, а не запрос.
+THUMBNAIL_QUEUE = os.getenv('THUMBNAIL_QUEUE', 'process')
+
+# Соединение с базой живёт между запросами, а не открывается на каждый.
+DATABASES = {
+    alias: {**database, 'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 600))}
+    for alias, database in DATABASES.items()
+}
+
+# Кэш общий для всех процессов сервера: у LocMemCache он свой в каждом,
+# и сброс версий страниц в одном процессе не видели бы остальные.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache',
+        ),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 50000)),
+        },
+    }
+}
+
+# Сессия читается из кэша, а база остаётся надёжной копией.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Шаблоны компилируются один раз при запуске, а статические
+# {% include %} вшиваются в шаблон, который их включает.
+TEMPLATE_WARM_UP = True
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                ('core.template_loaders.Loader', TEMPLATE_LOADERS),
+            ]),
+        ],
+    },
+}]
+
+# Сжатие и ETag ставятся до сессий, чтобы обработать готовый ответ.
+MIDDLEWARE = MIDDLEWARE[:2] + [
+    'django.middleware.gzip.GZipMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
+] + MIDDLEWARE[2:]
+
+# Имена статики с хэшем содержимого и сжатые копии: всё готовит
+# collectstatic при выкладке.
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+
+PERFORMANCE_SAMPLE_RATE = float(os.getenv('PERFORMANCE_SAMPLE_RATE', 0.1))
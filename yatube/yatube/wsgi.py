@@ -1,7 +1,16 @@
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
+from core.fileserver import FileServer
+from core.template_loaders import warm_up
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+if settings.SERVE_FILES:
+    application = FileServer(application)
+
+if settings.TEMPLATE_WARM_UP:
+    warm_up()